@@ -0,0 +1,128 @@
+"""Accuracy and latency of the local intent classifier (client_common/intent.py).
+
+Runs a held-out labeled set (none of these messages are training examples, some name both
+services) through the keyword matcher and the n-gram model, and reports accuracy per stage, how many messages would still go
+to the LLM at the configured threshold, and per-message latency. The old substring check of
+wx_client2 is scored on the same set for comparison.
+
+Run from the client directory:
+    uv run python benchmarks/bench_intent.py --repeat 2000
+    uv run python benchmarks/bench_intent.py --threshold 0.9 --json intent.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from client_common.intent import IntentClassifier
+
+HELD_OUT = [
+    ("what powervs workspaces exist", "powervs"),
+    ("list all power virtual servers", "powervs"),
+    ("how many PVS workspaces are in us-south", "powervs"),
+    ("show POWER workspaces", "powervs"),
+    ("which lpar workspaces are in madrid", "powervs"),
+    ("give me the workspaces per datacenter", "powervs"),
+    ("which regions host my virtual server workspaces", "powervs"),
+    ("list the workspaces in sao paulo", "powervs"),
+    ("what is the crn of the osaka workspace", "powervs"),
+    ("is the toronto workspace active", "powervs"),
+    ("power vs inventory please", "powervs"),
+    ("show my pwrvs workspaces", "powervs"),
+    ("any aix environments running", "powervs"),
+    ("update me on power workspaces", "powervs"),
+    ("schedule of my power servers", "powervs"),
+    ("list schematics workspaces", "schematics"),
+    ("show my DAs", "schematics"),
+    ("which deployments failed", "schematics"),
+    ("update my deployment status", "schematics"),
+    ("what deployable architectures do I have", "schematics"),
+    ("list the terraform templates", "schematics"),
+    ("which workspaces are in draft", "schematics"),
+    ("show workspaces that failed to apply", "schematics"),
+    ("who owns the inprogress workspaces", "schematics"),
+    ("what terraform versions are in use", "schematics"),
+    ("schematic workspace summary", "schematics"),
+    ("shematics workspaces please", "schematics"),
+    ("list the stacks and their state", "schematics"),
+    ("which workspaces have tags", "schematics"),
+    ("show the last destroy job", "schematics"),
+    ("list my powervs and schematics workspaces", "powervs+schematics"),
+    ("which pvs workspaces and which deployments failed", "powervs+schematics"),
+    ("give me both inventories", "powervs+schematics"),
+    ("summarize all my workspaces", "powervs+schematics"),
+]
+
+
+def substring_baseline(text: str) -> str:
+    """The keyword check wx_client2 used before the local classifier"""
+    message_lower = text.lower()
+    if any(keyword in message_lower for keyword in {"deployment", "schematics", "sch", "da", "das"}):
+        return "schematics"
+    return "powervs"
+
+
+def main(args: argparse.Namespace) -> dict:
+    classifier = IntentClassifier(threshold=args.threshold)
+    start = time.perf_counter()
+    classifier.model
+    train_ms = (time.perf_counter() - start) * 1000
+
+    rows = []
+    for text, expected in HELD_OUT:
+        intents = classifier.classify(text)
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            classifier.classify(text)
+            samples.append(time.perf_counter() - start)
+        rows.append((text, expected, intents, statistics.median(samples)))
+
+    def labels(intents: list) -> str:
+        return "+".join(sorted(intent.label for intent in intents))
+
+    def accuracy(selected: list) -> float | None:
+        return sum(labels(intents) == expected for _, expected, intents, _ in selected) / len(selected) if selected else None
+
+    keyword = [row for row in rows if row[2][0].source == "keyword"]
+    confident = [row for row in rows if row[2][0].source == "model" and classifier.is_confident(row[2])]
+    deferred = [row for row in rows if row[2][0].source == "model" and not classifier.is_confident(row[2])]
+    latencies = sorted(row[3] for row in rows)
+    results = {
+        "messages": len(rows),
+        "train_ms": round(train_ms, 2),
+        "accuracy_local": accuracy(rows),
+        "accuracy_keyword": accuracy(keyword),
+        "accuracy_model_confident": accuracy(confident),
+        "accuracy_substring_baseline": sum(substring_baseline(t) == e for t, e in HELD_OUT) / len(HELD_OUT),
+        "keyword": len(keyword),
+        "model_confident": len(confident),
+        "deferred_to_llm": len(deferred),
+        "latency_us_p50": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "latency_us_max": round(latencies[-1] * 1e6, 1),
+        "latency_us_keyword_p50": round(statistics.median(r[3] for r in keyword) * 1e6, 1) if keyword else None,
+        "latency_us_model_p50": round(statistics.median(r[3] for r in confident + deferred) * 1e6, 1) if confident + deferred else None,
+    }
+    if args.verbose:
+        for text, expected, intents, seconds in rows:
+            mark = "ok " if labels(intents) == expected else "BAD"
+            confidence = min(intent.confidence for intent in intents)
+            print(f"{mark} {intents[0].source:<8} {confidence:5.2f} {seconds * 1e6:7.1f}us  {labels(intents):<19} {text}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1000, help="Timed classifications per message")
+    parser.add_argument("--threshold", type=float, default=IntentClassifier().threshold)
+    parser.add_argument("--verbose", action="store_true", help="Print every message with its verdict")
+    parser.add_argument("--json", type=str, default="", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = main(args)
+    for name, value in results.items():
+        print(f"{name:<28} {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
@@ -2,15 +2,16 @@ import asyncio
 import json
 import warnings
 from dotenv import load_dotenv
-from typing import Annotated, Literal
+from typing import Literal
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
-from typing_extensions import TypedDict
 import httpx
-from mcp.client.session import ClientSession
-from mcp.client.sse import sse_client
+from client_common.graph import AGENT_TITLES, AGENT_TOOLS, State, merge_answers_node, next_agents, router
+from client_common.intent import intent_classifier
+from client_common.mcp_pool import ToolPrefetch, mcp_pool
+from client_common.streaming import STREAM_REPLIES, ReplyPrinter, stream_graph, timing_summary
 
 # Load environment variables
 load_dotenv()
@@ -28,41 +29,60 @@ llm = ChatOpenAI(model="gpt-3.5-turbo")
 
 # Define structured output schema
 class MessageClassifier(BaseModel):
-    message_type: Literal["powervs", "schematics"] = Field(
-        ..., description="Classify if the message is about schematics or powervs workspaces."
+    message_types: list[Literal["powervs", "schematics"]] = Field(
+        ..., description="Every kind of workspace the message asks about: powervs, schematics or both."
     )
 
 
-# Define state
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
-    message_type: str | None
-    powervs_context: str | None
-
-
 # Classifier node
 async def classify_message(state: State):
     last_message = state["messages"][-1]
+    intents = intent_classifier.classify(last_message.content)
+    labels = [intent.label for intent in intents]
+    if intent_classifier.is_confident(intents):
+        # Decided locally, no LLM round trip; only the chosen agents' tools are fetched.
+        print(labels)
+        prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels, mode="likely")
+        return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
+
+    # Start the agents' tool calls now so they overlap the classifier LLM call.
+    prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels)
     classifier_llm = llm.with_structured_output(MessageClassifier, method="function_calling")
 
-    result = await classifier_llm.ainvoke(
-        [
-            {
-                "role": "system",
-                "content": """Classify the user message as either:
+    async def ask_llm() -> list[str]:
+        result = await classifier_llm.ainvoke(
+            [
+                {
+                    "role": "system",
+                    "content": """Classify the user message as one or both of:
                 - 'powervs': if it mentions power, power virtual server, powervs, POWER, or pvs
                 - 'schematics': if it mentions deployment, schematics, sch, DA, DAs, das, or da""",
-            },
-            {"role": "user", "content": last_message.content},
-        ]
-    )
-    print(result.message_type)
-    return {"message_type": result.message_type}
+                },
+                {"role": "user", "content": last_message.content},
+            ]
+        )
+        return result.message_types
 
-
-# Router node
-def router(state: State):
-    return {"next": state.get("message_type", "powervs")}
+    # A failed or unusable LLM answer keeps the local guess.
+    try:
+        intents = await intent_classifier.fallback(intents, ask_llm)
+    except BaseException:
+        prefetch.keep([])
+        raise
+    labels = [intent.label for intent in intents]
+    print(labels)
+    return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
+
+
+# Stream an agent's LLM reply; the tokens reach the chat loop through the graph's custom stream
+async def generate_answer(agent: str, messages: list) -> str:
+    write = get_stream_writer()
+    content = ""
+    async for chunk in llm.astream(messages):
+        content += chunk.content
+        write({"agent": agent, "token": chunk.content})
+    write({"agent": agent, "done": True})
+    return content
 
 
 # PowerVS agent node
@@ -71,7 +91,7 @@ async def powervs_agent(state: State):
     print("PowerVS Agent called.")
 
     try:
-        context = await call_mcp_tool(tool_name="fetch_powervs_workspaces")
+        context = await call_mcp_tool(tool_name="fetch_powervs_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching powervs workspaces: {str(e)}"
 
@@ -87,8 +107,7 @@ async def powervs_agent(state: State):
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await llm.ainvoke(messages)
-    return {"messages": [{"role": "assistant", "content": reply.content}]}
+    return {"answers": {"powervs": await generate_answer("powervs", messages)}}
 
 
 # Schematics agent node
@@ -97,7 +116,7 @@ async def schematics_agent(state: State):
     print("Schematics Agent called.")
 
     try:
-        context = await call_mcp_tool(tool_name="fetch_schematics_workspaces")
+        context = await call_mcp_tool(tool_name="fetch_schematics_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching schematics workspaces: {str(e)}"
 
@@ -113,18 +132,12 @@ async def schematics_agent(state: State):
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await llm.ainvoke(messages)
-    return {"messages": [{"role": "assistant", "content": reply.content}]}
+    return {"answers": {"schematics": await generate_answer("schematics", messages)}}
 
 
-async def call_mcp_tool(tool_name: str):
-    url = "http://127.0.0.1:8000/sse"
-    async with sse_client(url) as streams:
-        async with ClientSession(streams[0], streams[1]) as session:
-            await session.initialize()
-            response = await session.call_tool(name=tool_name)
-            # print("Tool response:", response.content)
-            return response.content
+async def call_mcp_tool(tool_name: str, prefetch: ToolPrefetch | None = None):
+    response = await (prefetch.result(tool_name) if prefetch else mcp_pool.call_tool(tool_name))
+    return response.content
 
 
 # Build the graph
@@ -133,12 +146,14 @@ graph_builder.add_node("classifier", classify_message)
 graph_builder.add_node("router", router)
 graph_builder.add_node("powervs", powervs_agent)
 graph_builder.add_node("schematics", schematics_agent)
+graph_builder.add_node("merge", merge_answers_node)
 
 graph_builder.add_edge(START, "classifier")
 graph_builder.add_edge("classifier", "router")
-graph_builder.add_conditional_edges("router", lambda state: state.get("next"), {"powervs": "powervs", "schematics": "schematics"})
-graph_builder.add_edge("powervs", END)
-graph_builder.add_edge("schematics", END)
+graph_builder.add_conditional_edges("router", next_agents, {"powervs": "powervs", "schematics": "schematics"})
+graph_builder.add_edge("powervs", "merge")
+graph_builder.add_edge("schematics", "merge")
+graph_builder.add_edge("merge", END)
 
 graph = graph_builder.compile()
 
@@ -147,19 +162,29 @@ graph = graph_builder.compile()
 async def run_chatbot():
     state = {"messages": [], "message_type": None}
 
-    while True:
-        user_input = input("^_^ You      : ")
-        if user_input == "exit":
-            print("Bye")
-            break
-
-        state["messages"] = state.get("messages", []) + [{"role": "user", "content": user_input}]
-
-        state = await graph.ainvoke(state)
-
-        if state.get("messages") and len(state["messages"]) > 0:
-            last_message = state["messages"][-1]
-            print(f"o_o Assistant: {last_message.content}")
+    try:
+        while True:
+            user_input = await asyncio.to_thread(input, "^_^ You      : ")
+            if user_input == "exit":
+                print("Bye")
+                summary = timing_summary()
+                if summary:
+                    print(summary)
+                break
+
+            state["messages"] = state.get("messages", []) + [{"role": "user", "content": user_input}]
+
+            if STREAM_REPLIES:
+                state = await stream_graph(graph, state, ReplyPrinter(AGENT_TITLES))
+                continue
+
+            state = await graph.ainvoke(state)
+
+            if state.get("messages") and len(state["messages"]) > 0:
+                last_message = state["messages"][-1]
+                print(f"o_o Assistant: {last_message.content}")
+    finally:
+        await mcp_pool.aclose()
 
 
 if __name__ == "__main__":
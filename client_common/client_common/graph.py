@@ -0,0 +1,53 @@
+from typing import Annotated
+
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from client_common.mcp_pool import ToolPrefetch
+
+# Tool each agent answers from, fetched speculatively while the message is classified
+AGENT_TOOLS = {"powervs": "fetch_powervs_workspaces", "schematics": "fetch_schematics_workspaces"}
+AGENT_TITLES = {"powervs": "PowerVS", "schematics": "Schematics"}
+
+
+def merge_answers(current: dict | None, update: dict | None) -> dict:
+    """Reducer of State.answers: each agent adds its answer, None (from the classifier) starts a new turn"""
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
+
+
+# Graph state of the chat clients
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+    message_type: str | None
+    message_types: list[str]
+    next: list[str] | None
+    answers: Annotated[dict, merge_answers]
+    powervs_context: str | None
+    prefetch: ToolPrefetch | None
+
+
+# Router node: every agent the message needs, run in parallel
+async def router(state: State) -> dict:
+    routes = state.get("message_types") or [state.get("message_type") or "powervs"]
+    if state.get("prefetch"):
+        state["prefetch"].keep(routes)
+    return {"next": routes}
+
+
+def next_agents(state: State) -> list[str]:
+    """Conditional edge after the router: fans out to every agent it picked"""
+    return state.get("next")
+
+
+# Merge node: one reply from the answers of every agent that ran, in the order ReplyPrinter prints them
+async def merge_answers_node(state: State) -> dict:
+    answers = state.get("answers") or {}
+    if len(answers) == 1:
+        content = next(iter(answers.values()))
+    else:
+        order = state.get("message_types") or list(AGENT_TOOLS)
+        labels = [label for label in order if label in answers] + [label for label in answers if label not in order]
+        content = "\n\n".join(f"{AGENT_TITLES.get(label, label)}:\n{answers[label]}" for label in labels)
+    return {"messages": [{"role": "assistant", "content": content}]}
@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import numpy as np
+
+# Below this confidence the local classifier defers to the LLM.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+# Hash buckets of the n-gram model.
+INTENT_FEATURES = int(os.getenv("INTENT_FEATURES", "4096"))
+
+LABELS = ("powervs", "schematics")
+
+logger = logging.getLogger("intent")
+
+# Whole-word terms that settle the intent on their own ("da" must not match "update").
+KEYWORDS = {
+    "powervs": r"power\s*vs|power\s+virtual\s+servers?|power\s+systems?|power|pvs|lpars?|aix",
+    "schematics": r"schematics?|sch|das?|deployable\s+architectures?|deployments?|deploys?|terraform|iac",
+}
+# Terms that ask about every service at once.
+ALL_KEYWORDS = r"both|everything|every\s+service|all\s+(?:services|(?:of\s+)?(?:my\s+)?workspaces)|across\s+services"
+
+# Labeled examples the n-gram model is trained on; messages without a keyword are decided by it.
+EXAMPLES = [
+    ("list my powervs workspaces", "powervs"),
+    ("how many power virtual server workspaces do I have", "powervs"),
+    ("show pvs instances in dallas", "powervs"),
+    ("which power workspaces are in sydney", "powervs"),
+    ("what regions have power virtual servers", "powervs"),
+    ("list the lpars in my account", "powervs"),
+    ("are any aix workspaces active", "powervs"),
+    ("powervs workspace in frankfurt", "powervs"),
+    ("show me the virtual server workspaces per datacenter", "powervs"),
+    ("which datacenter hosts my vm workspaces", "powervs"),
+    ("how many workspaces are in each zone", "powervs"),
+    ("list workspaces by location", "powervs"),
+    ("give me the crn of the tokyo workspace", "powervs"),
+    ("what is the state of the workspaces in london", "powervs"),
+    ("count the instances per region", "powervs"),
+    ("power systems virtual servers overview", "powervs"),
+    ("pwr vs workspaces", "powervs"),
+    ("powrvs status", "powervs"),
+    ("list my schematics workspaces", "schematics"),
+    ("how many deployable architectures are deployed", "schematics"),
+    ("show failed deployments", "schematics"),
+    ("which das are inactive", "schematics"),
+    ("list the terraform workspaces", "schematics"),
+    ("what templates do my workspaces use", "schematics"),
+    ("which workspaces failed to apply", "schematics"),
+    ("show workspaces in draft state", "schematics"),
+    ("what is the status of my infrastructure as code", "schematics"),
+    ("which workspace ran a plan last", "schematics"),
+    ("show the terraform version of each workspace", "schematics"),
+    ("list the resource groups of my workspaces", "schematics"),
+    ("who created the inprogress workspaces", "schematics"),
+    ("which stacks are active", "schematics"),
+    ("schematic workspaces in eu-de", "schematics"),
+    ("shematics status", "schematics"),
+    ("list workspaces with tags", "schematics"),
+    ("show the last apply and destroy jobs", "schematics"),
+]
+
+
+@dataclass
+class Intent:
+    label: str
+    confidence: float
+    # "keyword", "model" or, once the caller fell back, "llm"
+    source: str
+
+
+def labels_in_text(text: str, labels: tuple[str, ...] = LABELS) -> list[str]:
+    """Labels named in a free-text LLM answer; "both" names all of them"""
+    text = text.strip().lower()
+    if "both" in text:
+        return list(labels)
+    return [label for label in labels if label in text]
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def ngram_features(text: str, dim: int) -> np.ndarray:
+    """Hashed bucket ids of the word unigrams, word bigrams and character trigrams of a message"""
+    words = tokenize(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    # crc32 rather than hash(): bucket ids must not change between processes.
+    return np.unique(np.fromiter((zlib.crc32(gram.encode()) % dim for gram in grams), dtype=np.int64, count=len(grams)))
+
+
+class NgramModel:
+    """Softmax regression over hashed n-gram features, trained with full-batch gradient descent"""
+
+    def __init__(self, labels: tuple[str, ...] = LABELS, dim: int = INTENT_FEATURES):
+        self.labels = labels
+        self.dim = dim
+        self.weights = np.zeros((len(labels), dim), dtype=np.float32)
+        self.bias = np.zeros(len(labels), dtype=np.float32)
+
+    def fit(self, examples: list[tuple[str, str]], epochs: int = 200, rate: float = 0.5, l2: float = 1e-3) -> "NgramModel":
+        x = np.zeros((len(examples), self.dim), dtype=np.float32)
+        for row, (text, _) in enumerate(examples):
+            x[row, ngram_features(text, self.dim)] = 1.0
+        y = np.eye(len(self.labels), dtype=np.float32)[[self.labels.index(label) for _, label in examples]]
+        for _ in range(epochs):
+            gradient = (self._softmax(x @ self.weights.T + self.bias) - y) / len(examples)
+            self.weights -= rate * (gradient.T @ x + l2 * self.weights)
+            self.bias -= rate * gradient.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, text: str) -> tuple[str, float]:
+        logits = self.weights[:, ngram_features(text, self.dim)].sum(axis=1) + self.bias
+        probabilities = self._softmax(logits)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+
+class IntentClassifier:
+    """Local powervs/schematics router: a compiled keyword matcher, then the n-gram model.
+
+    classify() always returns the best local guess, several intents when the message names more
+    than one service; when its confidence is below the threshold the caller settles it with
+    fallback(), which asks the LLM. The model is trained on first use (a few milliseconds).
+    """
+
+    def __init__(
+        self,
+        examples: list[tuple[str, str]] = EXAMPLES,
+        keywords: dict[str, str] = KEYWORDS,
+        all_keywords: str = ALL_KEYWORDS,
+        threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+    ):
+        self.examples = examples
+        self.patterns = {label: re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE) for label, pattern in keywords.items()}
+        self.all_pattern = re.compile(rf"\b(?:{all_keywords})\b", re.IGNORECASE)
+        self.threshold = threshold
+        self._model: NgramModel | None = None
+        self.counts = {"keyword": 0, "model": 0, "llm": 0, "llm_failed": 0}
+
+    @property
+    def model(self) -> NgramModel:
+        if self._model is None:
+            self._model = NgramModel().fit(self.examples)
+        return self._model
+
+    def classify(self, text: str) -> list[Intent]:
+        """Every intent of the message: all keyword matches, otherwise the model's single best label"""
+        if self.all_pattern.search(text):
+            matched = list(self.patterns)
+        else:
+            matched = [label for label, pattern in self.patterns.items() if pattern.search(text)]
+        if matched:
+            self.counts["keyword"] += 1
+            return [Intent(label, 1.0, "keyword") for label in matched]
+        label, confidence = self.model.predict(text)
+        if confidence >= self.threshold:
+            # Guesses below the threshold are counted by fallback() once the caller has asked the LLM.
+            self.counts["model"] += 1
+        return [Intent(label, confidence, "model")]
+
+    async def fallback(self, intents: list[Intent], ask: Callable[[], Awaitable[list[str]]]) -> list[Intent]:
+        """Settle a low-confidence classification with the LLM.
+
+        ask returns the labels the LLM chose. When it raises or names no known label, the local
+        guess (intents) is kept and the failure is logged and counted.
+        """
+        try:
+            labels = [label for label in dict.fromkeys(await ask()) if label in self.patterns]
+            if not labels:
+                logger.warning("LLM intent fallback named no known label, keeping the local guess")
+        except Exception as e:
+            logger.warning("LLM intent fallback failed, keeping the local guess: %s", e)
+            labels = []
+        if not labels:
+            self.counts["llm_failed"] += 1
+            return intents
+        self.counts["llm"] += 1
+        return [Intent(label, 1.0, "llm") for label in labels]
+
+    def is_confident(self, intents: list[Intent]) -> bool:
+        return all(intent.confidence >= self.threshold for intent in intents)
+
+
+intent_classifier = IntentClassifier()
@@ -0,0 +1,195 @@
+import asyncio
+import os
+from typing import Any
+
+import anyio
+import httpx
+from mcp.client.session import ClientSession
+from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult
+
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8000/sse")
+# Seconds between pings of an idle session; a failed ping reconnects it.
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "120"))
+MCP_RECONNECT_MAX_DELAY = float(os.getenv("MCP_RECONNECT_MAX_DELAY", "10"))
+# Speculative tool calls started alongside intent classification: "all" agents' tools,
+# only the "likely" one (the local classifier's best guess), or "off".
+MCP_PREFETCH = os.getenv("MCP_PREFETCH", "all").lower()
+
+# Errors meaning the session itself is gone (server restarted, connection dropped), not that the tool failed.
+CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, httpx.TransportError)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+class MCPSessionPool:
+    """One long-lived, initialized MCP session shared by every tool call of the process.
+
+    The SSE connection and ClientSession are owned by a background task (anyio scopes must be
+    entered and left by the same task); callers only send requests over it, so concurrent tool
+    calls are multiplexed on the one session by request id. The owner pings the server every
+    health_interval seconds and reconnects with backoff when the ping or the connection fails;
+    a call that hits a dropped connection is retried once on the fresh session.
+    """
+
+    def __init__(
+        self,
+        url: str = MCP_SERVER_URL,
+        health_interval: float = MCP_HEALTH_INTERVAL,
+        connect_timeout: float = MCP_CONNECT_TIMEOUT,
+        call_timeout: float = MCP_CALL_TIMEOUT,
+    ):
+        self.url = url
+        self.health_interval = health_interval
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.session: ClientSession | None = None
+        self.connects = 0
+        self.failures = 0
+        self.calls = 0
+        self.last_error: str | None = None
+        self._ready = asyncio.Event()
+        self._reset = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    async def get_session(self) -> ClientSession:
+        """The live session, connecting on first use and waiting for a reconnect in progress"""
+        if self._closing:
+            raise Exception("MCP session pool is closed")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"MCP server at {self.url} is unreachable: {self.last_error or 'connect timed out'}")
+        return self.session
+
+    async def call_tool(self, name: str, arguments: dict[str, Any] | None = None) -> CallToolResult:
+        for attempt in range(2):
+            session = await self.get_session()
+            try:
+                result = await asyncio.wait_for(session.call_tool(name=name, arguments=arguments), self.call_timeout)
+                self.calls += 1
+                return result
+            except Exception as e:
+                if attempt or not is_connection_error(e):
+                    raise
+                self.reconnect(session)
+
+    def reconnect(self, session: ClientSession | None = None) -> None:
+        """Drop the session (only if it is still `session`) and let the owner task open a new one"""
+        if self.session is not None and (session is None or session is self.session):
+            self._ready.clear()
+            self._reset.set()
+
+    async def _run(self) -> None:
+        delay = 0.5
+        while not self._closing:
+            failed = False
+            try:
+                async with sse_client(self.url, timeout=self.connect_timeout) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await asyncio.wait_for(session.initialize(), self.connect_timeout)
+                        self.session = session
+                        self.connects += 1
+                        self.last_error = None
+                        delay = 0.5
+                        self._ready.set()
+                        await self._watch(session)
+            except Exception as e:
+                failed = True
+                self.failures += 1
+                self.last_error = str(e) or type(e).__name__
+            finally:
+                self._ready.clear()
+                self._reset.clear()
+                self.session = None
+            # A requested reconnect is immediate; failures back off.
+            if failed and not self._closing:
+                await asyncio.sleep(delay)
+                delay = min(MCP_RECONNECT_MAX_DELAY, delay * 2)
+
+    async def _watch(self, session: ClientSession) -> None:
+        """Return when a reconnect is requested or the pool closes; raise when a health ping fails"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._reset.wait(), self.health_interval)
+                return
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(session.send_ping(), self.connect_timeout)
+
+    async def aclose(self) -> None:
+        self._closing = True
+        self._reset.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, self.connect_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self._ready.is_set(),
+            "connects": self.connects,
+            "failures": self.failures,
+            "calls": self.calls,
+            "last_error": self.last_error,
+        }
+
+
+# Shared by every graph invocation of the chat loop.
+mcp_pool = MCPSessionPool()
+
+
+class ToolPrefetch:
+    """Agent tool calls started speculatively while the message is still being classified.
+
+    tools maps each route to the tool its agent calls. The router keeps the chosen routes' calls
+    and cancels the others, so the tool fetch overlaps the classifier instead of following it.
+    """
+
+    def __init__(self, tools: dict[str, str], pool: MCPSessionPool = mcp_pool):
+        self.tools = tools
+        self.pool = pool
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, likely: list[str] | None = None, mode: str = MCP_PREFETCH) -> "ToolPrefetch":
+        if mode == "likely" and likely and all(route in self.tools for route in likely):
+            routes = likely
+        elif mode in ("all", "likely"):
+            routes = list(self.tools)
+        else:
+            routes = []
+        for route in routes:
+            tool_name = self.tools[route]
+            self._tasks[tool_name] = asyncio.ensure_future(self.pool.call_tool(tool_name))
+        return self
+
+    def keep(self, routes: list[str]) -> None:
+        """Cancel every speculative call except those of `routes` (an empty list cancels them all)"""
+        kept = {self.tools[route] for route in routes if route in self.tools}
+        for tool_name in list(self._tasks):
+            if tool_name not in kept:
+                task = self._tasks.pop(tool_name)
+                if task.done():
+                    # Retrieve a failure (e.g. server down) so asyncio does not warn it was never retrieved.
+                    if not task.cancelled():
+                        task.exception()
+                else:
+                    task.cancel()
+
+    async def result(self, tool_name: str) -> CallToolResult:
+        """The prefetched result of `tool_name`, or a fresh call when it was not speculated on"""
+        task = self._tasks.pop(tool_name, None)
+        if task is None:
+            return await self.pool.call_tool(tool_name)
+        return await task
@@ -0,0 +1,105 @@
+import os
+import statistics
+import sys
+import time
+from typing import Any, TextIO
+
+# Print reply tokens as they are generated instead of waiting for the whole answer.
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+
+# (time to first token, time to full reply) of every streamed reply of the session
+reply_timings: list[tuple[float, float]] = []
+
+
+class ReplyPrinter:
+    """Prints the tokens the agents stream through the graph, one agent's section at a time.
+
+    Sections follow the order of the agents expected for the turn, the order the merge node joins
+    their answers in, so the transcript matches the stored reply. The section being printed is
+    followed live; agents running in parallel with it are buffered until it is done. Times are
+    measured from creation, i.e. from the moment the user's message was submitted.
+    """
+
+    def __init__(self, titles: dict[str, str], prefix: str = "o_o Assistant: ", out: TextIO = sys.stdout):
+        self.titles = titles
+        self.prefix = prefix
+        self.out = out
+        self.agents: list[str] = []
+        self.started = time.perf_counter()
+        self.first_token: float | None = None
+        self._buffers: dict[str, list[str]] = {}
+        self._done: set[str] = set()
+        self._finished: set[str] = set()
+        self._printed: list[str] = []
+
+    def expect(self, agents: list[str]) -> None:
+        """Agents of this turn, in merge order; with more than one, each section gets a title"""
+        self.agents = agents
+
+    def feed(self, agent: str, token: str = "", done: bool = False) -> None:
+        if token:
+            self._buffers.setdefault(agent, []).append(token)
+        if done:
+            self._done.add(agent)
+        self._advance()
+
+    def finish(self, reply: str) -> tuple[float, float]:
+        """Print whatever is still buffered (or the whole reply when nothing was streamed) and the timings"""
+        self._advance(final=True)
+        if not self._printed:
+            self._write(self.prefix + reply)
+        total = time.perf_counter() - self.started
+        first_token = self.first_token if self.first_token is not None else total
+        reply_timings.append((first_token, total))
+        self._write(f"\n    [first token {first_token:.2f}s, full reply {total:.2f}s]\n")
+        return first_token, total
+
+    def _advance(self, final: bool = False) -> None:
+        # Print the next unfinished section up to where it is; move past it once it is done.
+        order = self.agents + [agent for agent in self._buffers if agent not in self.agents]
+        for agent in order:
+            if agent in self._finished:
+                continue
+            tokens = self._buffers.get(agent)
+            if tokens:
+                if agent not in self._printed:
+                    self._begin(agent)
+                if self.first_token is None:
+                    self.first_token = time.perf_counter() - self.started
+                self._write("".join(tokens))
+                tokens.clear()
+            if agent not in self._done and not final:
+                return
+            self._finished.add(agent)
+
+    def _begin(self, agent: str) -> None:
+        self._write(self.prefix if not self._printed else "\n\n")
+        if len(self.agents) > 1:
+            self._write(f"{self.titles.get(agent, agent)}:\n")
+        self._printed.append(agent)
+
+    def _write(self, text: str) -> None:
+        self.out.write(text)
+        self.out.flush()
+
+
+async def stream_graph(graph: Any, state: dict, printer: ReplyPrinter) -> dict:
+    """Run a compiled graph on state, printing the reply tokens its agents stream; returns the final state"""
+    async for mode, chunk in graph.astream(state, stream_mode=["values", "custom"]):
+        if mode == "custom":
+            printer.feed(**chunk)
+        else:
+            state = chunk
+            printer.expect(state.get("message_types") or [])
+    printer.finish(state["messages"][-1].content)
+    return state
+
+
+def timing_summary() -> str | None:
+    if not reply_timings:
+        return None
+    first_tokens, totals = zip(*reply_timings)
+    return (
+        f"{len(reply_timings)} replies: median first token {statistics.median(first_tokens):.2f}s, "
+        f"median full reply {statistics.median(totals):.2f}s"
+    )
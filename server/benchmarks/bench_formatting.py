@@ -0,0 +1,98 @@
+"""Compare dict records + per-helper string-append formatting with the slotted records and formatting engine.
+
+Run from the server directory:
+    uv run python benchmarks/bench_formatting.py --count 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper_functions.records import SchematicsWorkspace  # noqa: E402
+from helper_functions.schematics import sch_format_result  # noqa: E402
+
+
+def api_payload(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"us-south.workspace.ws-{i}.{i:08x}",
+            "name": f"ws-{i}",
+            "resource_group": "4f1b2c3d4e5f60718293a4b5c6d7e8f9",
+            "location": "us-south",
+            "status": ["ACTIVE", "INACTIVE", "FAILED", "DRAFT"][i % 4],
+            "created_at": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00.000Z",
+            "created_by": "someone@example.com",
+            "description": "x" * 64,
+            "tags": ["env:dev", "team:platform"],
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_extract(payload: list[dict]) -> list[dict]:
+    workspaces = []
+    for workspace in payload:
+        workspace_obj = {
+            "id": workspace.get("id"),
+            "name": workspace.get("name"),
+            "resource_group": workspace.get("resource_group"),
+            "location": workspace.get("location"),
+            "status": workspace.get("status"),
+            "created_at": workspace.get("created_at"),
+            "created_by": workspace.get("created_by"),
+        }
+        workspaces.append(workspace_obj)
+    return workspaces
+
+
+def legacy_format(workspaces: list[dict]) -> str:
+    output = []
+    for i, workspace in enumerate(workspaces, start=1):
+        output.append(f"Workspace {i}:")
+        output.append(f"- Name: {workspace.get('name')}")
+        output.append(f"- ID: {workspace.get('id')}")
+        output.append(f"- Resource Group: {workspace.get('resource_group')}")
+        output.append(f"- Location: {workspace.get('location')}")
+        output.append(f"- Status: {workspace.get('status')}")
+        output.append(f"- Created At: {workspace.get('created_at')}")
+        output.append(f"- Created By: {workspace.get('created_by')}")
+        output.append("")
+    return "\n".join(output)
+
+
+def measure(label: str, fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {best * 1000:9.2f} ms   peak {peak / 1024 / 1024:8.2f} MiB")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = api_payload(args.count)
+    print(f"{args.count} workspaces, best of {args.repeat}")
+
+    legacy_records = measure("extract: dict", lambda: legacy_extract(payload), args.repeat)
+    records = measure("extract: slotted", lambda: [SchematicsWorkspace.from_api(w) for w in payload], args.repeat)
+
+    legacy_text = measure("format text: string-append", lambda: legacy_format(legacy_records), args.repeat)
+    text = measure("format text: engine", lambda: sch_format_result(records), args.repeat)
+    for output_format in ("table", "json", "ndjson"):
+        measure(f"format {output_format}: engine", lambda: sch_format_result(records, output_format=output_format), args.repeat)
+
+    assert text == legacy_text, "engine text output differs from the legacy format"
@@ -0,0 +1,184 @@
+"""Concurrent-session load generator for a running MCP server.
+
+Opens N MCP sessions (SSE or Streamable HTTP, the same client stack as call_mcp_tool in
+server.py) and issues a weighted mix of tool calls and resource reads at a target rate.
+Reports client-side latency percentiles and error rates per operation, and samples the
+server's /metrics endpoint to show saturation (in-flight tool and upstream calls, and the
+gap between server-side and client-side latency).
+
+Start the server (optionally against mock_ibmcloud.py), then from the server directory:
+    uv run python benchmarks/bench_load.py --sessions 50 --rate 100 --duration 60 \
+        --mix fetch_schematics_workspaces=5,fetch_powervs_workspaces=3,resource=2
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+RESOURCE_OP = "resource"
+
+
+def parse_mix(spec: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def scrape(text: str) -> dict[str, float]:
+    """Sum the samples of every metric family we watch, across label sets"""
+    totals: dict[str, float] = defaultdict(float)
+    for line in text.splitlines():
+        match = re.match(r"^(mcp_[a-z_]+?)(?:\{[^}]*\})? ([0-9.e+-]+)$", line)
+        if match and not match.group(1).endswith("_bucket"):
+            totals[match.group(1)] += float(match.group(2))
+    return totals
+
+
+async def open_session(stack: AsyncExitStack, url: str, transport: str) -> ClientSession:
+    if transport == "sse":
+        read, write = await stack.enter_async_context(sse_client(url))
+    else:
+        read, write, _ = await stack.enter_async_context(streamablehttp_client(url))
+    session = await stack.enter_async_context(ClientSession(read, write))
+    await session.initialize()
+    return session
+
+
+async def sample_metrics(metrics_url: str, samples: list[dict[str, float]], stop: asyncio.Event) -> None:
+    async with httpx.AsyncClient(timeout=5) as client:
+        while not stop.is_set():
+            try:
+                samples.append(scrape((await client.get(metrics_url)).text))
+            except httpx.HTTPError:
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run(args: argparse.Namespace) -> None:
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    dropped = 0
+    outstanding = 0
+    rng = random.Random(args.seed)
+
+    async with AsyncExitStack() as stack:
+        connect_start = time.perf_counter()
+        # Opened one after another: the transports' task groups must be exited by the task that entered them.
+        sessions = [await open_session(stack, args.url, args.transport) for _ in range(args.sessions)]
+        print(f"Opened {len(sessions)} sessions in {time.perf_counter() - connect_start:.2f}s")
+
+        samples: list[dict[str, float]] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_metrics(args.metrics_url, samples, stop)) if args.metrics_url else None
+
+        async def one(session: ClientSession, op: str) -> None:
+            nonlocal outstanding
+            start = time.perf_counter()
+            try:
+                if op == RESOURCE_OP:
+                    await session.read_resource(args.resource_uri)
+                else:
+                    result = await session.call_tool(op, {})
+                    if result.isError:
+                        errors[op] += 1
+            except Exception:
+                errors[op] += 1
+            finally:
+                latencies[op].append(time.perf_counter() - start)
+                outstanding -= 1
+
+        # Open-loop arrivals: exponential inter-arrival times at the target rate, spread over the sessions.
+        tasks = set()
+        deadline = time.perf_counter() + args.duration
+        next_at = time.perf_counter()
+        i = 0
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if outstanding >= args.max_outstanding:
+                dropped += 1
+            else:
+                outstanding += 1
+                op = rng.choices(names, weights)[0]
+                task = asyncio.create_task(one(sessions[i % len(sessions)], op))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                i += 1
+            next_at += rng.expovariate(args.rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+        stop.set()
+        if sampler:
+            await sampler
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{total} requests in {args.duration:.0f}s ({total / args.duration:.1f} req/s achieved, target {args.rate}), dropped {dropped}")
+    print(f"{'operation':<32} {'count':>7} {'err %':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for op in names:
+        samples_ms = [latency * 1000 for latency in latencies[op]]
+        count = len(samples_ms)
+        error_pct = 100 * errors[op] / count if count else 0.0
+        print(
+            f"{op:<32} {count:7d} {error_pct:7.2f} {percentile(samples_ms, 50):9.1f} {percentile(samples_ms, 90):9.1f} "
+            f"{percentile(samples_ms, 99):9.1f} {max(samples_ms, default=0):9.1f}"
+        )
+
+    if args.metrics_url and len(samples) >= 2:
+        first, last = samples[0], samples[-1]
+        calls = last["mcp_tool_duration_seconds_count"] - first["mcp_tool_duration_seconds_count"]
+        busy = last["mcp_tool_duration_seconds_sum"] - first["mcp_tool_duration_seconds_sum"]
+        client_tool_latencies = [lat for op in names if op != RESOURCE_OP for lat in latencies[op]]
+        client_mean = sum(client_tool_latencies) / len(client_tool_latencies) if client_tool_latencies else 0.0
+        print("\nServer saturation (from /metrics):")
+        print(f"  peak tool calls in flight      {max(s['mcp_tool_in_flight'] for s in samples):.0f}")
+        print(f"  peak upstream calls in flight  {max(s['mcp_upstream_in_flight'] for s in samples):.0f}")
+        if calls:
+            server_mean = busy / calls
+            print(f"  server-side mean tool latency  {server_mean * 1000:.1f} ms")
+            print(f"  client-side mean tool latency  {client_mean * 1000:.1f} ms")
+            print(f"  transport/queueing overhead    {(client_mean - server_mean) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000/sse")
+    parser.add_argument("--transport", type=str, default="sse", choices=["sse", "streamable-http"])
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent MCP sessions")
+    parser.add_argument("--rate", type=float, default=20, help="Target requests per second across all sessions")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument(
+        "--mix",
+        type=str,
+        default="fetch_schematics_workspaces=5,fetch_powervs_workspaces=3,resource=2",
+        help="Weighted operations; 'resource' reads --resource_uri",
+    )
+    parser.add_argument("--resource_uri", type=str, default="echo://loadtest")
+    parser.add_argument("--max_outstanding", type=int, default=1000, help="Drop arrivals beyond this many in flight")
+    parser.add_argument(
+        "--metrics_url", type=str, default="http://127.0.0.1:8000/metrics", help="Empty to skip server-side sampling"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""Cold-start benchmark for the MCP server.
+
+Measures, over several fresh processes:
+  import  - time to import server.py (module load, tool registration)
+  stdio   - spawn `server.py --server_type=stdio` until initialize and tools/list have answered
+  sse / streamable-http - spawn the HTTP server until /metrics answers
+Reports min/median/max per mode; --json writes the numbers so runs can be compared.
+
+Run from the server directory:
+    uv run python benchmarks/bench_startup.py --runs 10 --modes import,stdio,sse
+    uv run python benchmarks/bench_startup.py --importtime   # slowest imports of one run
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+async def measure_stdio() -> float:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(
+        command=sys.executable, args=["server.py", "--server_type=stdio"], cwd=SERVER_DIR, env=dict(os.environ)
+    )
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.list_tools()
+                return time.perf_counter() - start
+
+
+def measure_http(server_type: str, port: int, timeout: float = 30) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py", f"--server_type={server_type}", f"--port={port}"],
+        cwd=SERVER_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        raise RuntimeError(f"{server_type} server did not answer within {timeout:g}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def print_importtime(limit: int = 25) -> None:
+    """Slowest imports (cumulative microseconds) of a single `import server`"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"], cwd=SERVER_DIR, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {module}")
+
+
+def main(args: argparse.Namespace) -> dict[str, list[float]]:
+    results: dict[str, list[float]] = {}
+    for mode in args.modes.split(","):
+        samples = []
+        for _ in range(args.runs):
+            if mode == "import":
+                samples.append(measure_import())
+            elif mode == "stdio":
+                samples.append(asyncio.run(measure_stdio()))
+            else:
+                samples.append(measure_http(mode, args.port))
+        results[mode] = samples
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode")
+    parser.add_argument("--modes", type=str, default="import,stdio,sse", help="import, stdio, sse, streamable-http")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--importtime", action="store_true", help="Only print the slowest imports of one run")
+    parser.add_argument("--json", type=str, default="", help="Write the results to this file")
+    args = parser.parse_args()
+
+    if args.importtime:
+        print_importtime()
+        sys.exit()
+
+    results = main(args)
+    print(f"{'mode':<16} {'min ms':>9} {'median ms':>10} {'max ms':>9}")
+    for mode, samples in results.items():
+        print(
+            f"{mode:<16} {min(samples) * 1000:9.1f} {statistics.median(samples) * 1000:10.1f} {max(samples) * 1000:9.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results_seconds": results}, f, indent=2)
@@ -0,0 +1,148 @@
+"""Tool latency/throughput benchmark against the local IBM Cloud stand-in (mock_ibmcloud.py).
+
+Starts the mock in a subprocess, points the helpers at it and calls the MCP tools through an
+in-memory MCP client session (full protocol path, no network transport).
+Every scenario reports p50/p90/p99 latency and throughput; --json writes the numbers so runs
+can be compared for regressions.
+
+Run from the server directory:
+    uv run python benchmarks/bench_tools.py --requests 200 --concurrency 20 --json bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def wait_for_port(host: str, port: int, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"mock IBM Cloud did not start on {host}:{port}")
+
+
+async def run_scenario(session, name: str, tool: str, arguments: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, dict(arguments))
+                errors += bool(result.isError)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "throughput_rps": requests / elapsed,
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    import server
+    from helper_functions.http_client import http_client_lifespan
+    from helper_functions.iam import get_api_access_token
+
+    scenarios = [
+        ("schematics cold", "fetch_schematics_workspaces", {"force_refresh": True}),
+        ("schematics warm", "fetch_schematics_workspaces", {}),
+        ("schematics structured only", "fetch_schematics_workspaces", {"include_text": False}),
+        ("powervs cold", "fetch_powervs_workspaces", {"force_refresh": True}),
+        ("powervs warm", "fetch_powervs_workspaces", {}),
+        ("query failed", "query_workspaces", {"status": "failed", "limit": 10}),
+    ]
+    results = []
+    async with http_client_lifespan(), create_connected_server_and_client_session(server.mcp) as session:
+        # Prime the token cache so the first scenario is not charged for the IAM exchange.
+        await get_api_access_token()
+        for name, tool, arguments in scenarios:
+            if args.only and args.only not in name:
+                continue
+            results.append(await run_scenario(session, name, tool, arguments, args.requests, args.concurrency))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100, help="Tool calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mock_port", type=int, default=9100)
+    parser.add_argument("--schematics_count", type=int, default=1000)
+    parser.add_argument("--powervs_per_region", type=int, default=20)
+    parser.add_argument("--latency_ms", type=float, default=50)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--only", type=str, default="", help="Run only scenarios whose name contains this text")
+    parser.add_argument("--json", type=str, default="", help="Write the results to this file")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.mock_port}"
+    os.environ.update(
+        {
+            "IBMCLOUD_IAM_URL": base_url,
+            "SCHEMATICS_URL": base_url,
+            "POWERVS_URL_TEMPLATE": base_url + "/powervs/{dc}",
+            "IBMCLOUD_API_KEY": "mock",
+        }
+    )
+    mock = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(SERVER_DIR, "mock_ibmcloud.py"),
+            f"--port={args.mock_port}",
+            f"--schematics_count={args.schematics_count}",
+            f"--powervs_per_region={args.powervs_per_region}",
+            f"--latency_ms={args.latency_ms}",
+            f"--error_rate={args.error_rate}",
+        ]
+    )
+    try:
+        wait_for_port("127.0.0.1", args.mock_port)
+        results = asyncio.run(main(args))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    print(f"{'scenario':<28} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for result in results:
+        print(
+            f"{result['scenario']:<28} {result['p50_ms']:9.1f} {result['p90_ms']:9.1f} "
+            f"{result['p99_ms']:9.1f} {result['throughput_rps']:9.1f} {result['errors']:7d}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
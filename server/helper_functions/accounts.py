@@ -0,0 +1,164 @@
+import hmac
+import os
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any
+
+from helper_functions.cache import ResultCache, result_cache
+from helper_functions.delta import InventoryVersions, inventory_versions
+from helper_functions.iam import TokenCache, token_cache
+from helper_functions.persistence import key_fingerprint
+from helper_functions.resilience import RateBudget, current_budget
+
+# Accounts kept in memory at once (least recently used first out) and how long an idle one is kept.
+ACCOUNTS_MAX = int(os.getenv("ACCOUNTS_MAX", "64"))
+ACCOUNT_IDLE_TTL = float(os.getenv("ACCOUNT_IDLE_TTL", "3600"))
+# Upstream budget of every account: concurrent requests and requests per second (0 = unlimited).
+ACCOUNT_MAX_CONCURRENCY = int(os.getenv("ACCOUNT_MAX_CONCURRENCY", "16"))
+ACCOUNT_RATE_LIMIT = float(os.getenv("ACCOUNT_RATE_LIMIT", "0"))
+# Cached tool results per account (the default account uses the shared result cache).
+ACCOUNT_RESULT_CACHE_ENTRIES = int(os.getenv("ACCOUNT_RESULT_CACHE_ENTRIES", "16"))
+
+# Per-session auth for the HTTP transports: the caller's own API key, or the name of a configured account
+# together with that account's shared secret (IBMCLOUD_ACCOUNT_SECRET_<NAME>).
+API_KEY_HEADER = "x-ibmcloud-api-key"
+ACCOUNT_HEADER = "x-ibmcloud-account"
+ACCOUNT_SECRET_HEADER = "x-ibmcloud-account-secret"
+
+DEFAULT_ACCOUNT = "default"
+
+# Keys the in-memory fingerprints of caller-supplied API keys; random per process.
+_FINGERPRINT_SALT = secrets.token_bytes(16)
+
+
+class Account:
+    """Everything that is isolated per IBM Cloud account: tokens, cached results, versions and upstream budget"""
+
+    def __init__(
+        self,
+        name: str,
+        tokens: TokenCache,
+        results: ResultCache | None = None,
+        versions: InventoryVersions | None = None,
+    ):
+        self.name = name
+        self.tokens = tokens
+        self.results = results or ResultCache(max_entries=ACCOUNT_RESULT_CACHE_ENTRIES)
+        self.results.ttl_overrides = result_cache.ttl_overrides
+        self.versions = versions or InventoryVersions()
+        self.index_cache: dict[tuple[str, ...], Any] = {}
+        self.budget = RateBudget(ACCOUNT_MAX_CONCURRENCY, ACCOUNT_RATE_LIMIT)
+        self.last_used = time.monotonic()
+
+    @property
+    def is_default(self) -> bool:
+        return self.tokens is token_cache
+
+    async def account_id(self) -> str:
+        """IBM Cloud account id, known without an IAM call once a token was issued or restored"""
+        if self.tokens.account_id is None:
+            await self.tokens.get()
+        return self.tokens.account_id
+
+    @contextmanager
+    def upstream_budget(self):
+        """Charge the upstream requests made inside the block (and the tasks it spawns) to this account"""
+        reset = current_budget.set(self.budget)
+        try:
+            yield
+        finally:
+            current_budget.reset(reset)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "account_id": self.tokens.account_id,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "token_cache": self.tokens.stats(),
+            "result_cache": self.results.stats(),
+            "throttled": self.budget.throttled,
+        }
+
+
+class AccountRegistry:
+    """Accounts by API key fingerprint, with LRU and idle eviction (the default account is never evicted).
+
+    Named accounts come from IBMCLOUD_API_KEY_<NAME> variables and are only handed to HTTP sessions
+    that send the name in X-IBMCloud-Account and the account's IBMCLOUD_ACCOUNT_SECRET_<NAME> in
+    X-IBMCloud-Account-Secret; an account without a secret cannot be selected. Callers can also send
+    their own key in the X-IBMCloud-API-Key header. Every account shares the pooled HTTP client, so the total number of
+    connections stays bounded by HTTP_MAX_CONNECTIONS however many accounts are active.
+    """
+
+    def __init__(self, max_accounts: int = ACCOUNTS_MAX, idle_ttl: float = ACCOUNT_IDLE_TTL):
+        self.max_accounts = max_accounts
+        self.idle_ttl = idle_ttl
+        self.default = Account(DEFAULT_ACCOUNT, token_cache, result_cache, inventory_versions)
+        self._accounts: OrderedDict[str, Account] = OrderedDict()
+        self.evictions = 0
+
+    @property
+    def named_keys(self) -> dict[str, str]:
+        """Configured accounts, read from the environment on use so .env and late settings are honoured"""
+        return {
+            name.removeprefix("IBMCLOUD_API_KEY_").lower(): value
+            for name, value in os.environ.items()
+            if name.startswith("IBMCLOUD_API_KEY_") and value
+        }
+
+    def get(self, name: str | None = None, api_key: str | None = None, secret: str | None = None) -> Account:
+        """Account for a configured name and its secret, or a caller-supplied API key; neither means the default account.
+
+        Unknown names and wrong secrets fail alike, so the configured names cannot be probed.
+        """
+        if name and name.lower() != DEFAULT_ACCOUNT:
+            label = name.lower()
+            api_key = self.named_keys.get(label)
+            expected = os.getenv(f"IBMCLOUD_ACCOUNT_SECRET_{label.upper()}")
+            if not (api_key and expected and secret and hmac.compare_digest(expected.encode(), secret.encode())):
+                raise Exception(f"Account '{name}' is not available to this session")
+        elif api_key:
+            label = f"key-{key_fingerprint(api_key, _FINGERPRINT_SALT)[:12]}"
+        else:
+            self.default.last_used = time.monotonic()
+            return self.default
+
+        fingerprint = key_fingerprint(api_key, _FINGERPRINT_SALT)
+        account = self._accounts.get(fingerprint)
+        if account is None:
+            account = Account(label, TokenCache(api_key))
+            self._accounts[fingerprint] = account
+        self._accounts.move_to_end(fingerprint)
+        account.last_used = time.monotonic()
+        self.evict()
+        return account
+
+    def evict(self) -> int:
+        """Drop accounts idle for longer than idle_ttl, then the least recently used beyond max_accounts"""
+        now = time.monotonic()
+        evicted = 0
+        while self._accounts:
+            fingerprint, oldest = next(iter(self._accounts.items()))
+            if len(self._accounts) <= self.max_accounts and now - oldest.last_used < self.idle_ttl:
+                break
+            del self._accounts[fingerprint]
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def active(self) -> list[Account]:
+        return [self.default] + list(self._accounts.values())
+
+    def stats(self) -> dict[str, Any]:
+        """Process-wide totals only; an account's own figures are reported to its sessions alone"""
+        active = self.active()
+        return {
+            "active": len(active),
+            "max_accounts": self.max_accounts,
+            "evictions": self.evictions,
+            "throttled": sum(account.budget.throttled for account in active),
+        }
+
+
+accounts = AccountRegistry()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+# Defaults for the tool result cache, overridable from the environment (.env).
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "60"))
+RESULT_CACHE_STALE_TTL = float(os.getenv("RESULT_CACHE_STALE_TTL", "600"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+
+
+class ResultCache:
+    """Bounded LRU cache of tool results with TTL and stale-while-revalidate.
+
+    Entries younger than their TTL are served directly. Entries past the TTL but
+    within the stale window are served immediately while one background task
+    refreshes them. Older entries (or misses) wait on a single in-flight fetch per key.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL,
+        stale_ttl: float = RESULT_CACHE_STALE_TTL,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.ttl_overrides: dict[Hashable, float] = {}
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def ttl_for(self, key: Hashable) -> float:
+        """TTL of a key; (tool, account id, ...) keys are matched on (tool, account id), then on the tool name"""
+        if key in self.ttl_overrides:
+            return self.ttl_overrides[key]
+        if isinstance(key, tuple) and key:
+            if key[:2] in self.ttl_overrides:
+                return self.ttl_overrides[key[:2]]
+            if key[0] in self.ttl_overrides:
+                return self.ttl_overrides[key[0]]
+        return self.ttl
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        force_refresh: bool = False,
+    ) -> Any:
+        """Return the cached value for key, calling fetch when it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None and not force_refresh:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            ttl = self.ttl_for(key)
+            if age < ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._start_fetch(key, fetch)
+                return value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    def put(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """Store a value; a non-zero age backdates it (e.g. to seed an already stale entry)"""
+        self._entries[key] = (value, time.monotonic() - age)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, prefix: Hashable | None = None) -> int:
+        """Drop one key, every tuple key starting with prefix, or everything when prefix is None.
+
+        Fetches already in flight for those keys still answer their callers but no longer store their result.
+        """
+
+        def matches(key: Hashable) -> bool:
+            return prefix is None or key == prefix or (isinstance(key, tuple) and key and key[0] == prefix)
+
+        keys = [key for key in self._entries if matches(key)]
+        for key in keys:
+            del self._entries[key]
+        for key in [key for key in self._inflight if matches(key)]:
+            del self._inflight[key]
+        return len(keys)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _start_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._fetch_done(key, t))
+        return task
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        # Not stored when the key was invalidated while the fetch was running.
+        if self._inflight.get(key) is asyncio.current_task():
+            self.put(key, value)
+        return value
+
+    def _fetch_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+
+
+result_cache = ResultCache()
+
+# Per-tool TTLs, e.g. RESULT_CACHE_TTL_FETCH_POWERVS_WORKSPACES=300, and per tool and account
+# (IBM Cloud account id after a double underscore), e.g. RESULT_CACHE_TTL_FETCH_POWERVS_WORKSPACES__<ACCOUNT_ID>=30
+for _name, _value in os.environ.items():
+    if _name.startswith("RESULT_CACHE_TTL_") and _value:
+        _tool, _, _account_id = _name.removeprefix("RESULT_CACHE_TTL_").lower().partition("__")
+        result_cache.ttl_overrides[(_tool, _account_id) if _account_id else _tool] = float(_value)
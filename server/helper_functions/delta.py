@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Iterable
+
+# Number of past listings per service that can be diffed against
+DELTA_MAX_VERSIONS = int(os.getenv("DELTA_MAX_VERSIONS", "64"))
+
+
+def record_hash(record: Any) -> str:
+    """Content hash of one workspace record"""
+    payload = json.dumps(record.to_dict(), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class InventoryVersions:
+    """Per-workspace content hashes of recent listings, addressed by opaque version tokens.
+
+    A token is derived from the hashes themselves, so the same inventory always gets the
+    same token. Only the last max_versions listings per service are kept.
+
+    A listing with unavailable regions carries the last known records of those regions forward,
+    so an outage is not reported as their removal (nor their return as additions).
+    """
+
+    def __init__(self, max_versions: int = DELTA_MAX_VERSIONS):
+        self.max_versions = max_versions
+        self._versions: dict[str, OrderedDict[str, dict[str, str]]] = {}
+        self._last: dict[str, tuple[list[Any], str]] = {}
+        # service -> workspace id -> region it was last listed in
+        self._regions: dict[str, dict[str, str | None]] = {}
+
+    def record(self, service: str, records: list[Any], unavailable: Iterable[str] = ()) -> str:
+        """Remember a listing and return its version token; unavailable names the regions that failed"""
+        last = self._last.get(service)
+        if last is not None and last[0] is records:
+            return last[1]
+
+        hashes = {record.id: record_hash(record) for record in records}
+        regions = self._regions.setdefault(service, {})
+        unavailable = set(unavailable)
+        versions = self._versions.setdefault(service, OrderedDict())
+        if unavailable and versions:
+            latest = next(reversed(versions.values()))
+            for key, value in latest.items():
+                if key not in hashes and regions.get(key) in unavailable:
+                    hashes[key] = value
+        regions.update((record.id, getattr(record, "region", None)) for record in records)
+        digest = hashlib.blake2b(digest_size=12)
+        for key in sorted(hashes):
+            digest.update(f"{key}={hashes[key]};".encode())
+        token = f"{service}.{digest.hexdigest()}"
+
+        versions[token] = hashes
+        versions.move_to_end(token)
+        while len(versions) > self.max_versions:
+            versions.popitem(last=False)
+        self._last[service] = (records, token)
+        return token
+
+    def hashes(self, service: str, token: str) -> dict[str, str] | None:
+        """Per-workspace hashes of a known version token"""
+        return self._versions.get(service, {}).get(token)
+
+    def diff(
+        self,
+        service: str,
+        since: str,
+        records: list[Any],
+        unavailable: Iterable[str] = (),
+        since_hashes: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """Records added, changed and removed between the listing behind since and records.
+
+        since_hashes stands in for a token this instance does not know (e.g. one issued by another
+        worker and read from the persistent cache). When since is unknown (never issued or already
+        evicted) every record is reported as added and full_resync is set. Workspaces of unavailable
+        regions are not reported as removed.
+        """
+        token = self.record(service, records, unavailable)
+        previous = self._versions[service].get(since) or since_hashes
+        current = self._versions[service][token]
+        if previous is None:
+            return {"version": token, "full_resync": True, "added": list(records), "changed": [], "removed": []}
+
+        added = []
+        changed = []
+        for record in records:
+            old_hash = previous.get(record.id)
+            if old_hash is None:
+                added.append(record)
+            elif old_hash != current[record.id]:
+                changed.append(record)
+        removed = [key for key in previous if key not in current]
+        return {"version": token, "full_resync": False, "added": added, "changed": changed, "removed": removed}
+
+
+inventory_versions = InventoryVersions()
@@ -0,0 +1,4 @@
+# Imported by server.py before the other helpers, which read their settings from the environment at import time.
+from dotenv import load_dotenv
+
+load_dotenv()
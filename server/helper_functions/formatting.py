@@ -0,0 +1,58 @@
+import io
+import json
+from operator import attrgetter
+from typing import Any, Iterable, Literal
+
+OutputFormat = Literal["text", "table", "json", "ndjson"]
+
+# Formats whose per-page output can be concatenated into the full listing
+STREAMABLE_FORMATS = ("text", "ndjson")
+
+
+def format_records(
+    records: Iterable[Any],
+    labels: dict[str, str],
+    output_format: OutputFormat = "text",
+    start: int = 1,
+    title: str = "Workspace",
+) -> str:
+    """Render workspace records into a single buffer.
+
+    labels maps record fields to display names and fixes the column order.
+    text    - one "Workspace N:" block per record (the tools' historical output)
+    table   - a header line and one "|"-separated row per record
+    json    - a JSON array of objects
+    ndjson  - one JSON object per line
+    """
+    buffer = io.StringIO()
+    write = buffer.write
+    fields = tuple(labels)
+    values = attrgetter(*fields) if len(fields) > 1 else lambda record: (getattr(record, fields[0]),)
+
+    if output_format == "text":
+        # One %-template per call; each record is a single format + write.
+        template = f"{title} %d:\n" + "".join(f"- {label.replace('%', '%%')}: %s\n" for label in labels.values())
+        for i, record in enumerate(records, start=start):
+            if i != start:
+                write("\n")
+            write(template % ((i,) + values(record)))
+    elif output_format == "table":
+        write(" | ".join(labels.values()))
+        for record in records:
+            write("\n")
+            write(" | ".join(map(_cell, values(record))))
+    elif output_format == "json":
+        write(json.dumps([dict(zip(fields, values(record))) for record in records], separators=(",", ":")))
+    elif output_format == "ndjson":
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        for i, record in enumerate(records):
+            if i:
+                write("\n")
+            write(encode(dict(zip(fields, values(record)))))
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'")
+    return buffer.getvalue()
+
+
+def _cell(value: Any) -> str:
+    return "-" if value is None else str(value).replace("|", "/")
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+
+from helper_functions.metrics import InstrumentedTransport
+
+# Pool and timeout settings, overridable from the environment (.env).
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "false").lower() in ("1", "true", "yes")
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional "h2" package (pip install "httpx[http2]").
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared, pooled AsyncClient used for all IBM Cloud calls"""
+    global _client
+    if _client is None or _client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client = httpx.AsyncClient(
+            transport=InstrumentedTransport(transport),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def http_client_lifespan():
+    """Open the shared client for the lifetime of the server and close it on shutdown"""
+    get_http_client()
+    try:
+        yield
+    finally:
+        await close_http_client()
@@ -1,31 +1,132 @@
-import httpx
+import asyncio
+import base64
+import json
+import time
 from typing import Any
 import os
 
-api_key = os.getenv("IBMCLOUD_API_KEY")
+from helper_functions.resilience import upstream_request
 
+# Base URL of IAM; point it at mock_ibmcloud.py for local benchmarking.
+IAM_URL = os.getenv("IBMCLOUD_IAM_URL", "https://iam.cloud.ibm.com")
+IAM_TOKEN_URL = f"{IAM_URL}/identity/token"
+
+# Refresh the token this many seconds before it expires. Callers inside the window
+# still get the cached token while a single background refresh runs.
+TOKEN_REFRESH_MARGIN = int(os.getenv("IAM_TOKEN_REFRESH_MARGIN", "300"))
+
+
+class TokenCache:
+    """Cache for the IAM access token of one API key with single-flight refresh"""
+
+    def __init__(self, api_key: str | None = None, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self._api_key = api_key
+        self.refresh_margin = refresh_margin
+        self.tokens: dict[str, Any] | None = None
+        self.expires_at = 0.0
+        # Account of the API key; kept across invalidation and restorable from the persistent cache.
+        self.account_id: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def api_key(self) -> str | None:
+        """The API key given at construction, else IBMCLOUD_API_KEY read when first needed (after .env is loaded)"""
+        return self._api_key or os.getenv("IBMCLOUD_API_KEY")
+
+    async def get(self) -> dict[str, Any]:
+        """Return a valid token, waiting on the in-flight refresh only when the cached one has expired"""
+        now = time.time()
+        if self.tokens and now < self.expires_at:
+            self.hits += 1
+            if now >= self.expires_at - self.refresh_margin:
+                # Still valid but close to expiry: refresh in the background.
+                self._start_refresh()
+            return self.tokens
+
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self) -> None:
+        """Drop the cached token so the next caller performs a fresh exchange"""
+        self.tokens = None
+        self.expires_at = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "expires_in": max(0, int(self.expires_at - time.time())),
+        }
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+            self._refresh_task.add_done_callback(_consume_exception)
+        return self._refresh_task
+
+    async def _refresh(self) -> dict[str, Any]:
+        refresh_token = self.tokens.get("refresh_token") if self.tokens else None
+        json_data = None
+        if refresh_token:
+            try:
+                json_data = await _request_token({"grant_type": "refresh_token", "refresh_token": refresh_token})
+            except Exception:
+                # Refresh tokens can be revoked or expire; fall back to the API key.
+                json_data = None
+        if json_data is None:
+            json_data = await _request_token({"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": self.api_key})
+
+        self.refreshes += 1
+        self.tokens = json_data
+        self.expires_at = _expiry_of(json_data)
+        self.account_id = get_account_id(json_data)
+        return json_data
 
-async def get_api_access_token() -> dict[str, Any] | None:
-    """Make a request to get an IBM Cloud Account access token(bearer token)"""
 
-    url = "https://iam.cloud.ibm.com/identity/token"
+def _consume_exception(task: asyncio.Task) -> None:
+    # Background refreshes may fail with nobody awaiting them; avoid "exception never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+def _expiry_of(json_data: dict[str, Any]) -> float:
+    """Absolute expiry (epoch seconds) of an IAM token response"""
+    if json_data.get("expiration"):
+        return float(json_data["expiration"])
+    return time.time() + float(json_data.get("expires_in", 3600))
+
+
+async def _request_token(data: dict[str, Any]) -> dict[str, Any]:
     headers = {
         "Content-Type": "application/x-www-form-urlencoded",
     }
-    data = {
-        "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
-        "apikey": api_key,
-    }
     auth = ("bx", "bx")  # equivalent to -u "bx:bx"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, data=data, auth=auth)
-
-        if response.status_code == 200:
-            json_data = response.json()
-            # access_token = json_data.get("access_token")
-            # refresh_token = json_data.get("refresh_token")
-            # print(json_data)
-            return json_data
-        else:
-            raise Exception(f"Request failed: {response.status_code} - {response.text}")
+    response = await upstream_request("POST", IAM_TOKEN_URL, ("iam", "global"), headers=headers, data=data, auth=auth)
+
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Request failed: {response.status_code} - {response.text}")
+
+
+token_cache = TokenCache()
+
+
+def get_account_id(tokens: dict[str, Any]) -> str:
+    """Return the IBM Cloud account id (account.bss claim) of an access token"""
+    try:
+        payload = tokens["access_token"].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["account"]["bss"]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return "default"
+
+
+async def get_api_access_token() -> dict[str, Any] | None:
+    """Make a request to get an IBM Cloud Account access token(bearer token)"""
+    return await token_cache.get()
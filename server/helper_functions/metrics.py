@@ -0,0 +1,222 @@
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable
+
+import httpx
+
+_tracer: Any = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value: float) -> str:
+    """Exact text for a sample value; ``:g`` would round anything past 6 significant digits"""
+    if isinstance(value, int):
+        return str(value)
+    if value.is_integer():
+        return str(int(value))
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self._lock:
+            counts = self.values.setdefault(labels, [0] * (len(self.buckets) + 2))
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += count
+                le = _labels(self.labelnames + ("le",), labels + (_format_value(bound) if bound != "+Inf" else bound,))
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+tool_duration = Histogram("mcp_tool_duration_seconds", "Tool call latency", ("tool", "outcome"))
+tool_in_flight = Gauge("mcp_tool_in_flight", "Tool calls currently running", ("tool",))
+tool_response_bytes = Histogram("mcp_tool_response_bytes", "UTF-8 size of the text returned by a tool", ("tool",), SIZE_BUCKETS)
+upstream_duration = Histogram(
+    "mcp_upstream_request_duration_seconds", "IBM Cloud API latency", ("service", "region", "status")
+)
+upstream_in_flight = Gauge("mcp_upstream_in_flight", "IBM Cloud API requests currently running", ("service",))
+upstream_retries = Counter("mcp_upstream_retries_total", "IBM Cloud API retries by cause", ("service", "status"))
+upstream_hedges = Counter("mcp_upstream_hedged_requests_total", "Hedged IBM Cloud API requests sent", ("service",))
+upstream_circuit_open = Gauge("mcp_upstream_circuit_open", "1 while the circuit of an upstream is open", ("service", "region"))
+cache_stats = Gauge("mcp_cache_stat", "Token and result cache counters (hits, misses, hit_rate, ...)", ("cache", "stat"))
+
+_metrics = [
+    tool_duration,
+    tool_in_flight,
+    tool_response_bytes,
+    upstream_duration,
+    upstream_in_flight,
+    upstream_retries,
+    upstream_hedges,
+    upstream_circuit_open,
+    cache_stats,
+]
+
+# Callables returning {cache name: stats dict}, evaluated at scrape time
+cache_stat_sources: list[Callable[[], dict[str, dict[str, Any]]]] = []
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every metric"""
+    for source in cache_stat_sources:
+        for cache, stats in source().items():
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)):
+                    cache_stats.set(cache, stat, value=value)
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _get_tracer() -> Any:
+    """OpenTelemetry tracer, imported on the first span rather than at startup (False when not installed)"""
+    global _tracer
+    if _tracer is None:
+        try:
+            # Spans are emitted only when OpenTelemetry is installed and configured by the deployment.
+            from opentelemetry import trace
+
+            _tracer = trace.get_tracer("mcp-server")
+        except ImportError:
+            _tracer = False
+    return _tracer
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """OpenTelemetry span when available, otherwise a no-op"""
+    tracer = _get_tracer()
+    if not tracer:
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def _response_size(result: Any) -> int:
+    """UTF-8 size in bytes of the text a tool returned"""
+    if isinstance(result, str):
+        return len(result.encode())
+    content = getattr(result, "content", None) or []
+    return sum(len((getattr(block, "text", "") or "").encode()) for block in content)
+
+
+def instrument_tool(fn):
+    """Record latency, in-flight count, response size and a span for an async MCP tool"""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        tool_in_flight.inc(name)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(f"tool {name}", tool=name):
+                result = await fn(*args, **kwargs)
+            outcome = "ok"
+            tool_response_bytes.observe(name, value=_response_size(result))
+            return result
+        finally:
+            tool_duration.observe(name, outcome, value=time.perf_counter() - start)
+            tool_in_flight.dec(name)
+
+    return wrapper
+
+
+def _upstream_labels(request: httpx.Request) -> tuple[str, str]:
+    """(service, region) of an IBM Cloud request, as tagged by the helpers or guessed from the host"""
+    if "upstream" in request.extensions:
+        return request.extensions["upstream"]
+    host = request.url.host
+    if ".power-iaas." in host:
+        return "powervs", host.split(".", 1)[0]
+    if host.startswith("iam."):
+        return "iam", "global"
+    if host.startswith("schematics."):
+        return "schematics", "global"
+    return host, "global"
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper timing every IBM Cloud request by service, region and status"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        service, region = _upstream_labels(request)
+        upstream_in_flight.inc(service)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with span(f"{request.method} {service}", service=service, region=region):
+                response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            upstream_duration.observe(service, region, status, value=time.perf_counter() - start)
+            upstream_in_flight.dec(service)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from helper_functions.records import PowerVSWorkspace, SchematicsWorkspace
+
+# SQLite file holding the last inventory and token metadata; empty disables persistence.
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH", "")
+# Persisted inventories older than this are ignored at startup.
+PERSISTENT_CACHE_MAX_AGE = float(os.getenv("PERSISTENT_CACHE_MAX_AGE", "86400"))
+
+RECORD_TYPES = {"schematics": SchematicsWorkspace, "powervs": PowerVSWorkspace}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    account_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (account_id, source)
+);
+CREATE TABLE IF NOT EXISTS token_meta (
+    fingerprint TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inventory_versions (
+    account_id TEXT NOT NULL,
+    service TEXT NOT NULL,
+    token TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    hashes TEXT NOT NULL,
+    PRIMARY KEY (account_id, service, token)
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def key_fingerprint(api_key: str | None, salt: bytes) -> str:
+    """Keyed one-way fingerprint of an API key; the key and tokens themselves are never written to disk"""
+    return hmac.new(salt, (api_key or "").encode(), hashlib.sha256).hexdigest()
+
+
+def _encode(value: Any) -> str:
+    # PowerVS results are (workspaces, region errors); Schematics results are a plain list.
+    if isinstance(value, tuple):
+        records, errors = value
+        return json.dumps({"records": [record.to_dict() for record in records], "errors": errors})
+    return json.dumps({"records": [record.to_dict() for record in value]})
+
+
+def _decode(source: str, payload: str) -> Any:
+    body = json.loads(payload)
+    record_type = RECORD_TYPES[source]
+    records = [record_type(**record) for record in body["records"]]
+    return (records, body["errors"]) if "errors" in body else records
+
+
+class InventoryStore:
+    """SQLite store for the last inventory of the default account, read at startup for warm restarts.
+
+    It also keeps the account's recent version tokens, so any worker can diff against a token another issued.
+
+    Queries run on a worker thread so the event loop never blocks on disk. The connection, schema and
+    the salt of the key fingerprints are set up once, on first use of the configured path.
+    """
+
+    def __init__(self, path: str = PERSISTENT_CACHE_PATH, max_age: float = PERSISTENT_CACHE_MAX_AGE):
+        self._path = path
+        self.max_age = max_age
+        self.loads = 0
+        self.saves = 0
+        self.errors = 0
+        self._connection: sqlite3.Connection | None = None
+        self._salt = b""
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @path.setter
+    def path(self, path: str) -> None:
+        # The server sets the path from its arguments after import; reopen on the next call.
+        with self._lock:
+            if path != self._path and self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._path = path
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._path)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held; the connection is shared by the worker threads.
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, timeout=5, check_same_thread=False)
+            try:
+                # WAL lets several uvicorn workers read while one writes.
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(_SCHEMA)
+                with connection:
+                    connection.execute(
+                        "INSERT OR IGNORE INTO store_meta VALUES ('fingerprint_salt', ?)", (secrets.token_hex(16),)
+                    )
+                row = connection.execute("SELECT value FROM store_meta WHERE name = 'fingerprint_salt'").fetchone()
+            except BaseException:
+                connection.close()
+                raise
+            self._salt = bytes.fromhex(row[0])
+            self._connection = connection
+        return self._connection
+
+    def _save(self, account_id: str, source: str, payload: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO inventory VALUES (?, ?, ?, ?)", (account_id, source, time.time(), payload)
+                )
+
+    def _save_token(self, api_key: str | None, account_id: str, expires_at: float) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO token_meta VALUES (?, ?, ?, ?)",
+                    (key_fingerprint(api_key, self._salt), account_id, expires_at, time.time()),
+                )
+
+    def _save_version(self, account_id: str, service: str, token: str, hashes: str, keep: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO inventory_versions VALUES (?, ?, ?, ?, ?)",
+                    (account_id, service, token, time.time(), hashes),
+                )
+                connection.execute(
+                    "DELETE FROM inventory_versions WHERE account_id = ? AND service = ? AND token NOT IN "
+                    "(SELECT token FROM inventory_versions WHERE account_id = ? AND service = ? ORDER BY saved_at DESC LIMIT ?)",
+                    (account_id, service, account_id, service, keep),
+                )
+
+    def _load_version(self, account_id: str, service: str, token: str) -> str | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT hashes FROM inventory_versions WHERE account_id = ? AND service = ? AND token = ?",
+                (account_id, service, token),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _load(self, api_key: str | None) -> tuple[str | None, dict[str, tuple[float, Any]]]:
+        with self._lock:
+            connection = self._connect()
+            fingerprint = key_fingerprint(api_key, self._salt)
+            row = connection.execute("SELECT account_id FROM token_meta WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is None:
+                return None, {}
+            account_id = row[0]
+            rows = connection.execute(
+                "SELECT source, saved_at, payload FROM inventory WHERE account_id = ? AND saved_at > ?",
+                (account_id, time.time() - self.max_age),
+            ).fetchall()
+        return account_id, {source: (saved_at, _decode(source, payload)) for source, saved_at, payload in rows if source in RECORD_TYPES}
+
+    async def save(self, account_id: str, source: str, value: Any) -> None:
+        """Persist the latest inventory of one source; failures are counted, never raised"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._save, account_id, source, _encode(value))
+            self.saves += 1
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+
+    async def save_token(self, api_key: str | None, account_id: str, expires_at: float) -> None:
+        """Remember which account an API key belongs to (by fingerprint) and when its token expires"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._save_token, api_key, account_id, expires_at)
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+
+    async def save_version(self, account_id: str, service: str, token: str, hashes: dict[str, str], keep: int) -> None:
+        """Share a version token and its workspace hashes with the other workers; the last `keep` are kept"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._save_version, account_id, service, token, json.dumps(hashes), keep)
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+
+    async def load_version(self, account_id: str, service: str, token: str) -> dict[str, str] | None:
+        """Workspace hashes of a version token saved by any worker, or None"""
+        if not self.enabled:
+            return None
+        try:
+            hashes = await asyncio.to_thread(self._load_version, account_id, service, token)
+            return json.loads(hashes) if hashes is not None else None
+        except (sqlite3.Error, OSError, ValueError):
+            self.errors += 1
+            return None
+
+    async def load(self, api_key: str | None) -> tuple[str | None, dict[str, tuple[float, Any]]]:
+        """Account id of the API key and its persisted inventories as {source: (saved_at, value)}"""
+        if not self.enabled:
+            return None, {}
+        try:
+            account_id, inventories = await asyncio.to_thread(self._load, api_key)
+        except (sqlite3.Error, OSError, ValueError, KeyError, TypeError):
+            self.errors += 1
+            return None, {}
+        self.loads += len(inventories)
+        return account_id, inventories
+
+    def stats(self) -> dict[str, Any]:
+        return {"enabled": self.enabled, "loads": self.loads, "saves": self.saves, "errors": self.errors}
+
+
+inventory_store = InventoryStore()
@@ -1,47 +1,76 @@
-import httpx
-from typing import Any
+import asyncio
+import os
+
+from helper_functions.formatting import OutputFormat, format_records
+from helper_functions.records import PowerVSWorkspace
+from helper_functions.resilience import CircuitOpenError, upstream_request
 
 # from iam import get_api_access_token
-# import asyncio
 
-# all_dcs = ["syd", "sao", "mon", "tor", "eu-de", "lon", "che", "tok", "osa", "mad", "us-east", "us-south"]
-all_dcs = ["syd"]
+all_dcs = ["syd", "sao", "mon", "tor", "eu-de", "lon", "che", "tok", "osa", "mad", "us-east", "us-south"]
 
+# Regions can be narrowed with a comma separated list, e.g. POWERVS_REGIONS=syd,lon
+if os.getenv("POWERVS_REGIONS"):
+    all_dcs = [dc.strip() for dc in os.getenv("POWERVS_REGIONS").split(",") if dc.strip()]
 
-def get_power_workspaces(tokens: dict) -> dict[str, Any] | None:
-    """Get all the schematics workspace created in the IBM Cloud account"""
-    workspaces = []
+# Maximum number of regions queried at the same time and the wall-clock budget per region.
+POWERVS_MAX_CONCURRENCY = int(os.getenv("POWERVS_MAX_CONCURRENCY", "12"))
+POWERVS_REGION_TIMEOUT = float(os.getenv("POWERVS_REGION_TIMEOUT", "15"))
+
+# Per-region base URL; point it at mock_ibmcloud.py (e.g. http://127.0.0.1:9100/powervs/{dc}) for local benchmarking.
+POWERVS_URL_TEMPLATE = os.getenv("POWERVS_URL_TEMPLATE", "https://{dc}.power-iaas.cloud.ibm.com")
+
+
+async def get_region_workspaces(dc: str, access_token: str) -> list[PowerVSWorkspace]:
+    """Get the PowerVS workspaces of a single region"""
+    url = f"{POWERVS_URL_TEMPLATE.format(dc=dc)}/v1/workspaces"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await upstream_request("GET", url, ("powervs", dc), headers=headers)
+    if response.status_code == 200:
+        return [PowerVSWorkspace.from_api(workspace, dc) for workspace in response.json()["workspaces"]]
+    else:
+        raise Exception(f"Failed to fetch workspace: {response.status_code} - {response.text}")
+
+
+async def get_power_workspaces(tokens: dict, regions: list[str] | None = None) -> tuple[list[PowerVSWorkspace], dict[str, str]]:
+    """Get the PowerVS workspaces of all regions concurrently.
+
+    Returns the workspaces of every region that answered and a region -> error message
+    map for the ones that failed or timed out.
+    """
     access_token = tokens["access_token"]
-    for dc in all_dcs:
-        url = f"https://{dc}.power-iaas.cloud.ibm.com/v1/workspaces"
-        headers = {"Authorization": f"Bearer {access_token}"}
-        response = httpx.get(url, headers=headers)
-        if response.status_code == 200:
-            for workspace in response.json()["workspaces"]:
-                workspace_obj = {
-                    "id": workspace.get("id"),
-                    "name": workspace.get("name"),
-                    "status": workspace.get("status"),
-                    "location": workspace.get("location").get("region"),
-                }
-                workspaces.append(workspace_obj)
+    semaphore = asyncio.Semaphore(POWERVS_MAX_CONCURRENCY)
+
+    async def fetch(dc: str) -> list[PowerVSWorkspace]:
+        async with semaphore:
+            return await asyncio.wait_for(get_region_workspaces(dc, access_token), POWERVS_REGION_TIMEOUT)
+
+    regions = regions or all_dcs
+    results = await asyncio.gather(*(fetch(dc) for dc in regions), return_exceptions=True)
+
+    workspaces = []
+    errors = {}
+    for dc, result in zip(regions, results):
+        if isinstance(result, asyncio.TimeoutError):
+            errors[dc] = f"Timed out after {POWERVS_REGION_TIMEOUT:g}s"
+        elif isinstance(result, CircuitOpenError):
+            errors[dc] = "Skipped, region is unhealthy (circuit open)"
+        elif isinstance(result, BaseException):
+            errors[dc] = str(result) or type(result).__name__
         else:
-            raise Exception(f"Failed to fetch workspace: {response.status_code} - {response.text}")
-    return workspaces
-
-
-def pvs_format_result(workspaces: dict) -> str:
-    """Format the schematics workspaces response into a readable string"""
-
-    output = []
-    for i, workspace in enumerate(workspaces, start=1):
-        output.append(f"Workspace {i}:")
-        output.append(f"- Name: {workspace.get('name')}")
-        output.append(f"- ID: {workspace.get('id')}")
-        output.append(f"- Location: {workspace.get('location')}")
-        output.append(f"- Status: {workspace.get('status')}")
-        output.append("")  # blank line between workspaces
-    return "\n".join(output)
+            workspaces.extend(result)
+    return workspaces, errors
+
+
+def pvs_format_result(
+    workspaces: list[PowerVSWorkspace], errors: dict[str, str] | None = None, output_format: OutputFormat = "text"
+) -> str:
+    """Format the PowerVS workspaces response into a readable string"""
+    result = format_records(workspaces, PowerVSWorkspace.LABELS, output_format)
+    if errors and output_format in ("text", "table"):
+        lines = [f"- {dc}: {error}" for dc, error in errors.items()]
+        result = "\n".join([result, "Unavailable regions:"] + lines)
+    return result
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+
+# Fields with an exact-match (case-insensitive) secondary index
+INDEXED_FIELDS = ("status", "location", "region", "resource_group", "created_by", "service")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO-8601 date or date-time as an aware datetime; naive values are taken as UTC"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_created_bound(value: str, end: bool = False) -> datetime:
+    """A created_after/created_before bound; a date-only end bound covers that whole day.
+
+    Returns the first instant outside the range for end bounds, so both bounds can be bisected left.
+    """
+    try:
+        if end and len(value) == 10:
+            return datetime.combine(date.fromisoformat(value) + timedelta(days=1), time(), tzinfo=timezone.utc)
+        parsed = parse_timestamp(value)
+    except ValueError:
+        raise ValueError(f"Invalid ISO-8601 date or date-time: '{value}'") from None
+    return parsed + timedelta(microseconds=1) if end else parsed
+
+
+class WorkspaceIndex:
+    """Secondary indexes over a list of workspace records.
+
+    Exact-match fields map a lowercased value to the set of row numbers holding it,
+    names and creation times are kept sorted so prefixes and ranges are a bisect away.
+    """
+
+    def __init__(self, records: list[dict[str, Any]]):
+        self.records = records
+        self.exact: dict[str, dict[str, set[int]]] = {field: {} for field in INDEXED_FIELDS}
+        names = []
+        created = []
+        for row, record in enumerate(records):
+            for field in INDEXED_FIELDS:
+                value = record.get(field)
+                if value is not None:
+                    self.exact[field].setdefault(str(value).lower(), set()).add(row)
+            if record.get("name"):
+                names.append((record["name"].lower(), row))
+            if record.get("created_at"):
+                try:
+                    created.append((parse_timestamp(record["created_at"]), row))
+                except ValueError:
+                    pass
+        names.sort()
+        created.sort()
+        self.name_keys = [name for name, _ in names]
+        self.name_rows = [row for _, row in names]
+        self.created_keys = [created_at for created_at, _ in created]
+        self.created_rows = [row for _, row in created]
+
+    def _name_prefix_rows(self, prefix: str) -> set[int]:
+        prefix = prefix.lower()
+        start = bisect_left(self.name_keys, prefix)
+        end = bisect_left(self.name_keys, prefix + "\uffff", lo=start)
+        return set(self.name_rows[start:end])
+
+    def _created_rows(self, after: str | None, before: str | None) -> set[int]:
+        start = bisect_left(self.created_keys, parse_created_bound(after)) if after else 0
+        end = bisect_left(self.created_keys, parse_created_bound(before, end=True)) if before else len(self.created_keys)
+        return set(self.created_rows[start:end])
+
+    def query(
+        self,
+        filters: dict[str, str] | None = None,
+        name_prefix: str | None = None,
+        created_after: str | None = None,
+        created_before: str | None = None,
+        fields: list[str] | None = None,
+        sort_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """Return the number of matching records and the (projected, sorted, limited) matches"""
+        candidates = []
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field not in self.exact:
+                raise ValueError(f"Cannot filter on '{field}', use one of: {', '.join(INDEXED_FIELDS)}")
+            candidates.append(self.exact[field].get(str(value).lower(), set()))
+        if name_prefix:
+            candidates.append(self._name_prefix_rows(name_prefix))
+        if created_after or created_before:
+            candidates.append(self._created_rows(created_after, created_before))
+
+        if candidates:
+            # Intersect starting from the most selective index.
+            candidates.sort(key=len)
+            rows = set(candidates[0])
+            for other in candidates[1:]:
+                rows &= other
+                if not rows:
+                    break
+        else:
+            rows = set(range(len(self.records)))
+
+        matches = [self.records[row] for row in sorted(rows)]
+        if sort_by:
+            # Case-insensitive, and records without the field stay last in either direction.
+            present = [record for record in matches if record.get(sort_by) is not None]
+            present.sort(key=lambda record: str(record[sort_by]).lower(), reverse=descending)
+            matches = present + [record for record in matches if record.get(sort_by) is None]
+        total = len(matches)
+        if limit is not None:
+            matches = matches[: max(limit, 0)]
+        if fields:
+            matches = [{field: record.get(field) for field in fields} for record in matches]
+        return total, matches
+
+
+_index_cache: dict[tuple[str, ...], tuple[list[list[Any]], WorkspaceIndex]] = {}
+
+
+def get_workspace_index(sources: dict[str, list[Any]], cache: dict | None = None) -> WorkspaceIndex:
+    """Return an index over the records of one or more services.
+
+    The index is rebuilt only when one of the record lists is replaced (a cache refresh
+    or a new inventory snapshot), so repeated queries reuse it. cache holds the indexes
+    of one account; the module-level cache is used when it is omitted.
+    """
+    if cache is None:
+        cache = _index_cache
+    key = tuple(sources)
+    record_lists = list(sources.values())
+    cached = cache.get(key)
+    if cached is not None and all(old is new for old, new in zip(cached[0], record_lists)):
+        return cached[1]
+    rows = [{**record.to_dict(), "service": service} for service, records in sources.items() for record in records]
+    index = WorkspaceIndex(rows)
+    cache[key] = (record_lists, index)
+    return index
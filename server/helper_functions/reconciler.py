@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+
+# Seconds between two reconcile passes; 0 disables the background reconciler.
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "0"))
+
+# Never print(): on the stdio transport stdout carries the JSON-RPC stream.
+logger = logging.getLogger("reconciler")
+
+
+@dataclass(frozen=True)
+class InventorySnapshot:
+    """Point-in-time copy of every inventory source"""
+
+    version: int
+    updated_at: float
+    data: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class InventoryReconciler:
+    """Control loop that keeps an in-memory inventory snapshot in sync with IBM Cloud.
+
+    Every interval each loader is run concurrently. Sources that fail keep their
+    previous data and record the error; the version only moves when data changes.
+    Listeners are awaited with (previous, current) snapshots after every version change,
+    including the ones made by update().
+    """
+
+    def __init__(self, loaders: dict[str, Callable[[], Awaitable[Any]]], interval: float = RECONCILE_INTERVAL):
+        self.loaders = loaders
+        self.interval = interval
+        self.snapshot = InventorySnapshot(version=0, updated_at=0.0)
+        self.listeners: list[Callable[[InventorySnapshot, InventorySnapshot], Awaitable[None]]] = []
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get(self, source: str) -> Any | None:
+        """Return the snapshot data of a source, or None when it has never been loaded"""
+        return self.snapshot.data.get(source) if self.running else None
+
+    def restore(self, data: dict[str, Any], updated_at: float) -> None:
+        """Seed the snapshot (e.g. from the persistent cache) until the first reconcile pass replaces it"""
+        self.snapshot = InventorySnapshot(version=self.snapshot.version + 1, updated_at=updated_at, data=dict(data))
+
+    async def reconcile_once(self) -> InventorySnapshot:
+        names = list(self.loaders)
+        results = await asyncio.gather(*(self.loaders[name]() for name in names), return_exceptions=True)
+
+        previous = self.snapshot
+        data = dict(previous.data)
+        errors = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                errors[name] = str(result) or type(result).__name__
+            else:
+                data[name] = result
+
+        version = previous.version + 1 if data != previous.data else previous.version
+        self.snapshot = InventorySnapshot(version=version, updated_at=time.time(), data=data, errors=errors)
+        if version != previous.version:
+            await self._notify(previous)
+        return self.snapshot
+
+    async def update(self, source: str, value: Any) -> InventorySnapshot:
+        """Replace one source with data fetched outside the control loop (e.g. a forced refresh).
+
+        Keeps the snapshot from serving data older than what a caller has already been given.
+        """
+        previous = self.snapshot
+        if source in previous.data and previous.data[source] == value:
+            return previous
+        errors = {name: error for name, error in previous.errors.items() if name != source}
+        self.snapshot = InventorySnapshot(
+            version=previous.version + 1,
+            updated_at=time.time(),
+            data={**previous.data, source: value},
+            errors=errors,
+        )
+        await self._notify(previous)
+        return self.snapshot
+
+    def invalidate(self, sources: list[str] | None = None) -> int:
+        """Drop sources (all when None) from the snapshot so they are fetched on demand until the next pass.
+
+        The version and listeners are left alone: no new data was seen.
+        """
+        previous = self.snapshot
+        dropped = [name for name in previous.data if sources is None or name in sources]
+        if dropped:
+            self.snapshot = InventorySnapshot(
+                version=previous.version,
+                updated_at=previous.updated_at,
+                data={name: value for name, value in previous.data.items() if name not in dropped},
+                errors=previous.errors,
+            )
+        return len(dropped)
+
+    async def _notify(self, previous: InventorySnapshot) -> None:
+        for listener in self.listeners:
+            try:
+                await listener(previous, self.snapshot)
+            except Exception as e:
+                logger.warning("Inventory listener failed: %s", e)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.reconcile_once()
+            except Exception as e:
+                logger.warning("Inventory reconcile failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and not self.running:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def lifespan(self):
+        """Run the control loop for the lifetime of the server"""
+        self.start()
+        try:
+            yield self
+        finally:
+            await self.stop()
+
+
+@contextmanager
+def leader_lock(path: str) -> Iterator[bool]:
+    """Hold an exclusive, non-blocking lock on path for the block; yields whether this process got it.
+
+    Lets one uvicorn worker run the reconciler. The OS releases the lock with the process, so the
+    worker that replaces a dead leader takes over at startup.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): every worker reconciles.
+        yield True
+        return
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import Annotated, Any
+
+from pydantic import BaseModel, Field, WithJsonSchema
+
+
+@dataclass(slots=True)
+class SchematicsWorkspace:
+    """A schematics workspace as returned by /v1/workspaces, reduced to the fields we serve"""
+
+    id: str | None
+    name: str | None
+    resource_group: str | None
+    location: str | None
+    status: str | None
+    created_at: str | None
+    created_by: str | None
+
+    # Field order and labels used by the text and table formats
+    LABELS = {
+        "name": "Name",
+        "id": "ID",
+        "resource_group": "Resource Group",
+        "location": "Location",
+        "status": "Status",
+        "created_at": "Created At",
+        "created_by": "Created By",
+    }
+
+    @classmethod
+    def from_api(cls, workspace: dict[str, Any]) -> "SchematicsWorkspace":
+        get = workspace.get
+        return cls(
+            get("id"),
+            get("name"),
+            get("resource_group"),
+            get("location"),
+            get("status"),
+            get("created_at"),
+            get("created_by"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+@dataclass(slots=True)
+class PowerVSWorkspace:
+    """A PowerVS workspace as returned by {dc}.power-iaas/v1/workspaces.
+
+    location is the zone the API reports (e.g. dal12), region the data center it was listed from (e.g. us-south).
+    """
+
+    id: str | None
+    name: str | None
+    status: str | None
+    location: str | None
+    region: str | None = None
+
+    LABELS = {
+        "name": "Name",
+        "id": "ID",
+        "region": "Region",
+        "location": "Location",
+        "status": "Status",
+    }
+
+    @classmethod
+    def from_api(cls, workspace: dict[str, Any], region: str | None = None) -> "PowerVSWorkspace":
+        get = workspace.get
+        return cls(get("id"), get("name"), get("status"), (get("location") or {}).get("region"), region)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def records_schema(record_type: type) -> WithJsonSchema:
+    """Inline JSON schema for a list of records (nullable strings, no $ref/anyOf).
+
+    Python MCP clients validate structured content with jsonschema; the flat form
+    validates several times faster per record than the schema pydantic derives.
+    """
+    fields = list(record_type.__slots__)
+    return WithJsonSchema(
+        {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": ["string", "null"]} for field in fields},
+                "required": fields,
+            },
+        }
+    )
+
+
+def merged_records_schema(*record_types: type) -> WithJsonSchema:
+    """Inline JSON schema for rows merged from several record types, tagged with their service"""
+    fields = ["service"] + list(dict.fromkeys(field for record_type in record_types for field in record_type.__slots__))
+    return WithJsonSchema(
+        {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": ["string", "null"]} for field in fields},
+                "required": ["service", "id"],
+            },
+        }
+    )
+
+
+def unique_records(records: list[Any]) -> list[Any]:
+    """Drop repeated workspace ids (offset paging can return a record twice while the list shifts).
+
+    The same list is returned when there is nothing to drop, so identity-based caches keep working.
+    """
+    seen = set()
+    unique = [record for record in records if not (record.id in seen or seen.add(record.id))]
+    return records if len(unique) == len(records) else unique
+
+
+class SchematicsListing(BaseModel):
+    """Structured content of fetch_schematics_workspaces"""
+
+    count: int = Field(description="Number of workspaces returned")
+    version: str = Field(description="Version token to pass to fetch_workspace_changes")
+    workspaces: Annotated[list[SchematicsWorkspace], records_schema(SchematicsWorkspace)]
+
+
+class PowerVSListing(BaseModel):
+    """Structured content of fetch_powervs_workspaces"""
+
+    count: int = Field(description="Number of workspaces returned")
+    version: str = Field(description="Version token to pass to fetch_workspace_changes")
+    workspaces: Annotated[list[PowerVSWorkspace], records_schema(PowerVSWorkspace)]
+    unavailable_regions: dict[str, str] = Field(default_factory=dict, description="Region -> error for regions that failed")
+
+
+class WorkspaceChanges(BaseModel):
+    """Structured content of fetch_workspace_changes"""
+
+    service: str
+    since: str | None
+    version: str = Field(description="Version token of the current listing")
+    full_resync: bool = Field(description="True when since was unknown and every workspace is reported as added")
+    added: list[dict[str, Any]]
+    changed: list[dict[str, Any]]
+    removed: list[str] = Field(description="IDs of workspaces that no longer exist")
+    unavailable_regions: dict[str, str] = Field(
+        default_factory=dict, description="Region -> error for PowerVS regions that failed; their workspaces are kept"
+    )
+
+
+class SourceStatus(BaseModel):
+    """Outcome of one source of fetch_inventory"""
+
+    count: int = Field(description="Number of workspaces returned by the source")
+    duration_ms: float = Field(description="Time spent fetching the source")
+    version: str | None = Field(default=None, description="Version token to pass to fetch_workspace_changes")
+    error: str | None = Field(default=None, description="Why the source failed, when it did")
+
+
+class InventoryListing(BaseModel):
+    """Structured content of fetch_inventory"""
+
+    count: int = Field(description="Number of workspaces across all sources")
+    workspaces: Annotated[list[dict[str, Any]], merged_records_schema(SchematicsWorkspace, PowerVSWorkspace)]
+    sources: dict[str, SourceStatus] = Field(description="Per-source count, timing, version token and error")
+    unavailable_regions: dict[str, str] = Field(default_factory=dict, description="PowerVS region -> error for regions that failed")
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from helper_functions.http_client import get_http_client
+from helper_functions.metrics import upstream_circuit_open, upstream_hedges, upstream_retries
+
+# Retries of 429/5xx answers and transport errors, with full-jitter exponential backoff.
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.2"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "5"))
+# A Retry-After longer than this is not waited for; the error is returned instead.
+UPSTREAM_RETRY_AFTER_MAX = float(os.getenv("UPSTREAM_RETRY_AFTER_MAX", "10"))
+
+# Consecutive failures that open a host's circuit, and how long it stays open before a probe.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Hedged GETs: a second request is sent when the first is slower than this quantile of recent latencies.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "2"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RateBudget:
+    """Upstream budget of one account: at most `concurrency` requests in flight and `rate` requests per second"""
+
+    def __init__(self, concurrency: int, rate: float = 0.0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.throttled = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def __aenter__(self) -> "RateBudget":
+        await self._semaphore.acquire()
+        try:
+            while self.rate > 0:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                self.throttled += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._semaphore.release()
+
+
+# Budget of the account whose inventory is being fetched; set by the caller, inherited by spawned tasks.
+current_budget: ContextVar[RateBudget | None] = ContextVar("current_budget", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the upstream while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream host (closed -> open -> half-open)"""
+
+    def __init__(self, key: tuple[str, str], threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.key = key
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent; in half-open state only a single probe is let through"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        upstream_circuit_open.set(*self.key, value=0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            upstream_circuit_open.set(*self.key, value=1)
+
+    def release(self) -> None:
+        """End a request that says nothing about the host's health (e.g. throttled), freeing a half-open probe"""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Recent successful latencies of one upstream, used to pick the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.samples)
+        return max(HEDGE_MIN_DELAY, ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))])
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+_latencies: dict[tuple[str, str], LatencyTracker] = {}
+
+
+def get_breaker(upstream: tuple[str, str]) -> CircuitBreaker:
+    if upstream not in _breakers:
+        _breakers[upstream] = CircuitBreaker(upstream)
+    return _breakers[upstream]
+
+
+def circuit_states() -> dict[str, str]:
+    """Non-closed circuits, e.g. {"powervs/syd": "open"}"""
+    return {f"{service}/{region}": b.state for (service, region), b in _breakers.items() if b.state != "closed"}
+
+
+def retry_delay(attempt: int, response: httpx.Response | None = None) -> float | None:
+    """Seconds to wait before retry number `attempt` (0-based), or None when Retry-After exceeds the budget"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = 0.0
+        if seconds > UPSTREAM_RETRY_AFTER_MAX:
+            return None
+        if seconds > 0:
+            return seconds
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2**attempt))
+
+
+async def _hedged(send: Callable[[], Awaitable[httpx.Response]], delay: float, service: str) -> httpx.Response:
+    """Send once; if no answer within `delay`, send again and return whichever succeeds first.
+
+    A retryable status (429/5xx) is kept as a fallback like an exception, and only returned when
+    no request succeeds.
+    """
+    tasks = {asyncio.ensure_future(send())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            upstream_hedges.inc(service)
+            tasks.add(asyncio.ensure_future(send()))
+        error: BaseException | None = None
+        fallback: httpx.Response | None = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif task.result().status_code in RETRYABLE_STATUSES:
+                    fallback = task.result()
+                else:
+                    return task.result()
+        if fallback is not None:
+            return fallback
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def upstream_request(method: str, url: str, upstream: tuple[str, str], hedge: bool = True, **kwargs: Any) -> httpx.Response:
+    """Send an IBM Cloud request with retries, Retry-After support, a per-host circuit breaker and hedging.
+
+    upstream is the (service, region) pair used for metrics and to key the breaker. The last
+    response is returned even when it is an error, so callers keep their own status handling.
+    Hedging only applies to GETs.
+    """
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{upstream[0]} {upstream[1]} is unavailable (circuit open after repeated failures)")
+
+    tracker = _latencies.setdefault(upstream, LatencyTracker())
+    client = get_http_client()
+    budget = current_budget.get()
+
+    async def send() -> httpx.Response:
+        if budget is not None:
+            async with budget:
+                return await _send()
+        return await _send()
+
+    async def _send() -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, extensions={"upstream": upstream}, **kwargs)
+        if response.status_code < 400:
+            tracker.observe(time.perf_counter() - start)
+        return response
+
+    succeeded = False
+    throttled = False
+    try:
+        for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+            response = None
+            throttled = False
+            try:
+                if hedge and HEDGE_ENABLED and method == "GET":
+                    response = await _hedged(send, tracker.hedge_delay(), upstream[0])
+                else:
+                    response = await send()
+            except httpx.TransportError:
+                if attempt == UPSTREAM_MAX_RETRIES:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES:
+                    # 4xx other than 429 are the caller's problem, not a sign of an unhealthy host.
+                    succeeded = True
+                    return response
+                throttled = response.status_code == 429
+                if attempt == UPSTREAM_MAX_RETRIES:
+                    return response
+
+            delay = retry_delay(attempt, response)
+            if delay is None:
+                return response
+            upstream_retries.inc(upstream[0], str(response.status_code) if response is not None else "transport")
+            await asyncio.sleep(delay)
+    finally:
+        # 5xx, transport errors, timeouts and cancellation by the caller's deadline count against the host.
+        # A 429 only means this caller is throttled, and the breaker is shared by every account.
+        if succeeded:
+            breaker.record_success()
+        elif throttled:
+            breaker.release()
+        else:
+            breaker.record_failure()
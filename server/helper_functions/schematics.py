@@ -1,45 +1,66 @@
-import httpx
-from typing import Any
+import os
+from typing import AsyncIterator, Awaitable, Callable
 
+from helper_functions.formatting import OutputFormat, format_records
+from helper_functions.records import SchematicsWorkspace
+from helper_functions.resilience import upstream_request
 
-def get_schematics_workspaces(tokens: dict) -> dict[str, Any] | None:
-    """Get all the schematics workspace created in the IBM Cloud account"""
+# The Schematics API returns at most this many workspaces per request.
+SCHEMATICS_MAX_PAGE_SIZE = 200
+
+# Number of workspaces requested per page, clamped to the API maximum.
+SCHEMATICS_PAGE_SIZE = min(int(os.getenv("SCHEMATICS_PAGE_SIZE", "100")), SCHEMATICS_MAX_PAGE_SIZE)
+
+# Base URL of the Schematics API; point it at mock_ibmcloud.py for local benchmarking.
+SCHEMATICS_URL = os.getenv("SCHEMATICS_URL", "https://schematics.cloud.ibm.com")
+
+
+async def iter_schematics_workspace_pages(
+    tokens: dict, page_size: int = SCHEMATICS_PAGE_SIZE
+) -> AsyncIterator[tuple[list[SchematicsWorkspace], int | None]]:
+    """Yield the schematics workspaces one page at a time, with the total count reported by the API"""
 
     access_token = tokens["access_token"]
-    url = f"https://schematics.cloud.ibm.com/v1/workspaces"
+    url = f"{SCHEMATICS_URL}/v1/workspaces"
     headers = {"Authorization": f"Bearer {access_token}"}
-    response = httpx.get(url, headers=headers)
-    if response.status_code == 200:
-        # print(response.json())
-        workspaces = []
-        for workspace in response.json()["workspaces"]:
-            workspace_obj = {
-                "id": workspace.get("id"),
-                "name": workspace.get("name"),
-                "resource_group": workspace.get("resource_group"),
-                "location": workspace.get("location"),
-                "status": workspace.get("status"),
-                "created_at": workspace.get("created_at"),
-                "created_by": workspace.get("created_by"),
-            }
-            workspaces.append(workspace_obj)
-        return workspaces
-    else:
-        raise Exception(f"Failed to fetch workspace: {response.status_code} - {response.text}")
-
-
-def sch_format_result(workspaces: dict) -> str:
-    """Format the schematics workspaces response into a readable string"""
+    page_size = max(1, min(page_size, SCHEMATICS_MAX_PAGE_SIZE))
+    offset = 0
+    while True:
+        params = {"offset": offset, "limit": page_size}
+        response = await upstream_request("GET", url, ("schematics", "global"), headers=headers, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch workspace: {response.status_code} - {response.text}")
+
+        body = response.json()
+        raw_workspaces = body.get("workspaces") or []
+        count = body.get("count")
+        workspaces = [SchematicsWorkspace.from_api(workspace) for workspace in raw_workspaces]
+        del body, raw_workspaces  # only keep the extracted fields of the current page
+        yield workspaces, count
 
-    output = []
-    for i, workspace in enumerate(workspaces, start=1):
-        output.append(f"Workspace {i}:")
-        output.append(f"- Name: {workspace.get('name')}")
-        output.append(f"- ID: {workspace.get('id')}")
-        output.append(f"- Resource Group: {workspace.get('resource_group')}")
-        output.append(f"- Location: {workspace.get('location')}")
-        output.append(f"- Status: {workspace.get('status')}")
-        output.append(f"- Created At: {workspace.get('created_at')}")
-        output.append(f"- Created By: {workspace.get('created_by')}")
-        output.append("")  # blank line between workspaces
-    return "\n".join(output)
+        offset += len(workspaces)
+        # Trust the reported total when there is one: the API may return fewer rows than asked for
+        if not workspaces or (offset >= count if count is not None else len(workspaces) < page_size):
+            break
+
+
+async def get_schematics_workspaces(
+    tokens: dict,
+    on_page: Callable[[list[SchematicsWorkspace], int, int | None], Awaitable[None]] | None = None,
+) -> list[SchematicsWorkspace]:
+    """Get all the schematics workspace created in the IBM Cloud account.
+
+    on_page, when given, is awaited after every page with the page, the number of
+    workspaces fetched so far and the total count.
+    """
+    workspaces = []
+    async for page, count in iter_schematics_workspace_pages(tokens):
+        workspaces.extend(page)
+        if on_page is not None:
+            await on_page(page, len(workspaces), count)
+    return workspaces
+
+
+def sch_format_result(workspaces: list[SchematicsWorkspace], start: int = 1, output_format: OutputFormat = "text") -> str:
+    """Format the schematics workspaces response into a readable string"""
+    return format_records(workspaces, SchematicsWorkspace.LABELS, output_format, start=start)
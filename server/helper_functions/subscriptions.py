@@ -0,0 +1,78 @@
+import weakref
+from collections import defaultdict
+from typing import Any
+
+from pydantic import AnyUrl
+
+# Workspace resources; the PowerVS one is a template with one resource per region.
+SCHEMATICS_RESOURCE = "schematics://workspaces"
+POWERVS_RESOURCE = "powervs://{region}/workspaces"
+
+
+def powervs_region_uri(region: str) -> str:
+    return POWERVS_RESOURCE.format(region=region)
+
+
+def workspaces_by_region(workspaces: list[Any]) -> dict[str, list[Any]]:
+    """PowerVS workspaces grouped by the data center they were listed from, the key region errors use too"""
+    regions: dict[str, list[Any]] = defaultdict(list)
+    for workspace in workspaces:
+        regions[workspace.region].append(workspace)
+    return regions
+
+
+def changed_resource_uris(previous: dict[str, Any], current: dict[str, Any]) -> set[str]:
+    """URIs of the workspace resources whose content differs between two inventory snapshots"""
+    uris = set()
+    if "schematics" in current and previous.get("schematics") != current["schematics"]:
+        uris.add(SCHEMATICS_RESOURCE)
+    if "powervs" in current and previous.get("powervs") != current["powervs"]:
+        old_workspaces, old_errors = previous.get("powervs") or ([], {})
+        new_workspaces, new_errors = current["powervs"]
+        old_regions, new_regions = workspaces_by_region(old_workspaces), workspaces_by_region(new_workspaces)
+        for region in set(old_regions) | set(new_regions) | set(old_errors) | set(new_errors):
+            if old_regions.get(region) != new_regions.get(region) or old_errors.get(region) != new_errors.get(region):
+                uris.add(powervs_region_uri(region))
+    return uris
+
+
+class ResourceSubscriptions:
+    """Sessions subscribed to each resource URI, notified with resources/updated on change.
+
+    Sessions are held weakly, so a disconnected client drops out without an unsubscribe.
+    Subscriptions live in the worker that owns the session (SSE or stateful streamable-http).
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, weakref.WeakSet] = defaultdict(weakref.WeakSet)
+        self.notifications = 0
+        self.failures = 0
+
+    def subscribe(self, uri: str, session: Any) -> None:
+        self._sessions[uri].add(session)
+
+    def unsubscribe(self, uri: str, session: Any) -> None:
+        if uri in self._sessions:
+            self._sessions[uri].discard(session)
+
+    async def notify(self, uris: set[str]) -> None:
+        """Send resources/updated for every changed URI to the sessions subscribed to it"""
+        for uri in uris:
+            for session in list(self._sessions.get(uri, ())):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                    self.notifications += 1
+                except Exception:
+                    # The client went away; forget the session.
+                    self.failures += 1
+                    self._sessions[uri].discard(session)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "subscriptions": sum(len(sessions) for sessions in self._sessions.values()),
+            "notifications": self.notifications,
+            "failures": self.failures,
+        }
+
+
+resource_subscriptions = ResourceSubscriptions()
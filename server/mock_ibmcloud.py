@@ -0,0 +1,173 @@
+"""Local stand-in for the IBM Cloud endpoints used by the MCP server.
+
+Emulates IAM (/identity/token), Schematics (/v1/workspaces, paged) and PowerVS
+(/powervs/{dc}/v1/workspaces) with configurable account sizes, latency and error injection.
+
+    uv run mock_ibmcloud.py --port 9100 --schematics_count 2000 --latency_ms 80 --error_rate 0.01
+
+Point the server at it with:
+    IBMCLOUD_IAM_URL=http://127.0.0.1:9100
+    SCHEMATICS_URL=http://127.0.0.1:9100
+    POWERVS_URL_TEMPLATE=http://127.0.0.1:9100/powervs/{dc}
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+ALL_DCS = ["syd", "sao", "mon", "tor", "eu-de", "lon", "che", "tok", "osa", "mad", "us-east", "us-south"]
+# The API reports a workspace's zone in location.region, not the data center it is listed from.
+ZONES = {
+    "syd": "syd04",
+    "sao": "sao01",
+    "mon": "mon01",
+    "tor": "tor01",
+    "eu-de": "eu-de-1",
+    "lon": "lon06",
+    "che": "che01",
+    "tok": "tok04",
+    "osa": "osa21",
+    "mad": "mad02",
+    "us-east": "wdc06",
+    "us-south": "dal12",
+}
+STATUSES = ["ACTIVE", "INACTIVE", "FAILED", "DRAFT", "INPROGRESS"]
+
+
+def fake_jwt(account_id: str, expiration: int) -> str:
+    """An unsigned JWT carrying the claims the server reads (account.bss, exp)"""
+
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'none'})}.{encode({'account': {'bss': account_id}, 'exp': expiration})}.mock"
+
+
+def schematics_workspaces(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"us-south.workspace.mock-{i}.{i:08x}",
+            "name": f"mock-workspace-{i:05d}",
+            "resource_group": f"rg-{i % 5}",
+            "location": ["us-south", "us-east", "eu-de", "eu-gb"][i % 4],
+            "status": STATUSES[i % len(STATUSES)],
+            "created_at": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00.000Z",
+            "created_by": f"user{i % 7}@example.com",
+            "description": "Workspace generated by mock_ibmcloud.py",
+            "template_data": [{"folder": ".", "type": "terraform_v1.5"}],
+        }
+        for i in range(count)
+    ]
+
+
+def powervs_workspaces(dc: str, count: int) -> list[dict]:
+    return [
+        {
+            "id": f"{dc}-{i:04d}",
+            "name": f"pvs-{dc}-{i:04d}",
+            "status": ["active", "inactive"][i % 2],
+            "location": {"region": ZONES[dc], "type": "data-center", "url": f"https://{dc}.power-iaas.cloud.ibm.com"},
+            "details": {"creationDate": "2024-01-01T00:00:00Z"},
+        }
+        for i in range(count)
+    ]
+
+
+def create_app(args: argparse.Namespace) -> Starlette:
+    rng = random.Random(args.seed)
+    schematics = schematics_workspaces(args.schematics_count)
+    powervs = {dc: powervs_workspaces(dc, args.powervs_per_region) for dc in ALL_DCS}
+    slow_regions = set(filter(None, args.slow_regions.split(",")))
+    failing_regions = set(filter(None, args.failing_regions.split(",")))
+    stats = {"iam": 0, "schematics": 0, "powervs": 0, "errors": 0}
+
+    async def delay(extra_ms: float = 0) -> None:
+        await asyncio.sleep(max(0.0, args.latency_ms + rng.uniform(-args.jitter_ms, args.jitter_ms) + extra_ms) / 1000)
+
+    def inject_error() -> JSONResponse | None:
+        if rng.random() < args.error_rate:
+            stats["errors"] += 1
+            status = rng.choice([429, 500, 502, 503])
+            return JSONResponse({"error": "injected failure"}, status_code=status, headers={"Retry-After": "1"})
+        return None
+
+    async def token(request: Request) -> JSONResponse:
+        stats["iam"] += 1
+        await delay()
+        form = await request.form()
+        if form.get("grant_type") not in ("urn:ibm:params:oauth:grant-type:apikey", "refresh_token"):
+            return JSONResponse({"errorMessage": "unsupported grant_type"}, status_code=400)
+        now = int(time.time())
+        return JSONResponse(
+            {
+                "access_token": fake_jwt(args.account_id, now + args.token_ttl),
+                "refresh_token": f"mock-refresh-{now}",
+                "token_type": "Bearer",
+                "expires_in": args.token_ttl,
+                "expiration": now + args.token_ttl,
+            }
+        )
+
+    async def list_schematics(request: Request) -> JSONResponse:
+        stats["schematics"] += 1
+        await delay()
+        if error := inject_error():
+            return error
+        offset = int(request.query_params.get("offset", 0))
+        limit = min(int(request.query_params.get("limit", 100)), 200)
+        page = schematics[offset : offset + limit]
+        return JSONResponse({"offset": offset, "limit": limit, "count": len(schematics), "workspaces": page})
+
+    async def list_powervs(request: Request) -> JSONResponse:
+        dc = request.path_params["dc"]
+        stats["powervs"] += 1
+        await delay(args.slow_region_ms if dc in slow_regions else 0)
+        if dc in failing_regions:
+            return JSONResponse({"error": "region unavailable"}, status_code=503)
+        if error := inject_error():
+            return error
+        return JSONResponse({"workspaces": powervs.get(dc, [])})
+
+    async def mock_stats(request: Request) -> JSONResponse:
+        return JSONResponse(stats)
+
+    return Starlette(
+        routes=[
+            Route("/identity/token", token, methods=["POST"]),
+            Route("/v1/workspaces", list_schematics, methods=["GET"]),
+            Route("/powervs/{dc}/v1/workspaces", list_powervs, methods=["GET"]),
+            Route("/mock/stats", mock_stats, methods=["GET"]),
+        ]
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local IBM Cloud stand-in for benchmarking the MCP server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--schematics_count", type=int, default=500, help="Schematics workspaces in the account")
+    parser.add_argument("--powervs_per_region", type=int, default=20, help="PowerVS workspaces in every region")
+    parser.add_argument("--latency_ms", type=float, default=50, help="Base latency of every call")
+    parser.add_argument("--jitter_ms", type=float, default=10, help="Uniform +/- jitter added to the latency")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of listing calls answered with 429/5xx")
+    parser.add_argument("--slow_regions", type=str, default="", help="Comma separated PowerVS regions to slow down")
+    parser.add_argument("--slow_region_ms", type=float, default=2000, help="Extra latency of the slow regions")
+    parser.add_argument("--failing_regions", type=str, default="", help="Comma separated PowerVS regions answering 503")
+    parser.add_argument("--token_ttl", type=int, default=3600)
+    parser.add_argument("--account_id", type=str, default="mock-account")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
@@ -1,68 +1,577 @@
-from dotenv import load_dotenv
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Annotated, Literal
 
-# import os, httpx
-# from typing import Any
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
+from mcp.types import CallToolResult, TextContent
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
-# import asyncio
-import argparse
+# Helpers are imported eagerly: together they add about 10 ms to a 650-850 ms cold start that is
+# almost all the mcp package (benchmarks/bench_startup.py --importtime).
+import helper_functions.env  # noqa: F401 - loads .env, must stay the first helper import
+from helper_functions.schematics import get_schematics_workspaces, sch_format_result
+from helper_functions.iam import get_account_id, token_cache
+from helper_functions.powervs import get_power_workspaces, pvs_format_result
+from helper_functions.http_client import http_client_lifespan
+from helper_functions.cache import result_cache
+from helper_functions.reconciler import InventoryReconciler, InventorySnapshot, RECONCILE_INTERVAL, leader_lock
+from helper_functions.query import get_workspace_index
+from helper_functions.formatting import OutputFormat, STREAMABLE_FORMATS
+from helper_functions.records import (
+    InventoryListing,
+    PowerVSListing,
+    PowerVSWorkspace,
+    SchematicsListing,
+    SchematicsWorkspace,
+    WorkspaceChanges,
+    unique_records,
+)
+from helper_functions.metrics import cache_stat_sources, instrument_tool, render_metrics
+from helper_functions.resilience import circuit_states
+from helper_functions.persistence import inventory_store
+from helper_functions.accounts import ACCOUNT_HEADER, ACCOUNT_SECRET_HEADER, API_KEY_HEADER, Account, accounts
+from helper_functions.subscriptions import (
+    POWERVS_RESOURCE,
+    SCHEMATICS_RESOURCE,
+    changed_resource_uris,
+    resource_subscriptions,
+    workspaces_by_region,
+)
 
-# from fastapi.routing import APIRoute
-# import asyncio
-# import uvicorn
-from mcp import ClientSession
-from mcp.client.sse import sse_client
+# Initialize FastMCP server
+mcp = FastMCP("server")
+# Hosts FastMCP applies DNS-rebinding protection to by default.
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
 
-# import asyncio
+# Environment Variables
 
-from helper_functions.schematics import *
-from helper_functions.iam import *
-from helper_functions.powervs import *
+logger = logging.getLogger("server")
 
 
-load_dotenv()
+async def persist_inventory(account: Account, tokens: dict, source: str, value) -> None:
+    """Write the latest inventory and token metadata to the persistent cache (no-op when disabled).
 
-# Initialize FastMCP server
-mcp = FastMCP("server")
+    Only the default account is persisted: it is the only one restore_inventory reads back, and
+    accounts built from caller-supplied keys must not leave their data on disk.
+    """
+    if not account.is_default or not inventory_store.enabled:
+        return
+    account_id = get_account_id(tokens)
+    await inventory_store.save_token(account.tokens.api_key, account_id, account.tokens.expires_at)
+    await inventory_store.save(account_id, source, value)
+    # The listing's version token, shared so fetch_workspace_changes on another worker can diff against it.
+    records, errors = value if source == "powervs" else (value, {})
+    token = account.versions.record(source, records, errors)
+    hashes = account.versions.hashes(source, token)
+    await inventory_store.save_version(account_id, source, token, hashes, keep=account.versions.max_versions)
 
-# Environment Variables
+
+async def load_schematics_workspaces(account: Account | None = None, on_page=None):
+    account = account or accounts.default
+    with account.upstream_budget():
+        tokens = await account.tokens.get()
+        workspaces = await get_schematics_workspaces(tokens, on_page)
+    await persist_inventory(account, tokens, "schematics", workspaces)
+    return workspaces
+
+
+async def load_power_workspaces(account: Account | None = None):
+    account = account or accounts.default
+    with account.upstream_budget():
+        tokens = await account.tokens.get()
+        result = await get_power_workspaces(tokens)
+    await persist_inventory(account, tokens, "powervs", result)
+    return result
+
+
+# Optional background control loop (--reconcile_interval / RECONCILE_INTERVAL), for the default account
+reconciler = InventoryReconciler({"schematics": load_schematics_workspaces, "powervs": load_power_workspaces})
+
+
+def resolve_account(ctx: Context) -> Account:
+    """Account the session authenticated for with its headers, else the default account.
+
+    Tools take no account argument: it would come from the model, which must not be able to switch
+    the session to credentials it was not given.
+    """
+    request = ctx.request_context.request
+    headers = getattr(request, "headers", None) or {}
+    return accounts.get(headers.get(ACCOUNT_HEADER), headers.get(API_KEY_HEADER), headers.get(ACCOUNT_SECRET_HEADER))
+
+
+async def restore_inventory() -> None:
+    """Load the persisted inventory so the first calls after a restart are answered from it.
+
+    Restored entries are seeded as stale: they are served at once while the first call
+    (or the reconciler) refreshes them in the background.
+    """
+    account_id, inventories = await inventory_store.load(token_cache.api_key)
+    if account_id is None or not inventories:
+        return
+    token_cache.account_id = account_id
+    for source, (saved_at, value) in inventories.items():
+        key = (f"fetch_{source}_workspaces", account_id)
+        result_cache.put(key, value, age=result_cache.ttl_for(key))
+    reconciler.restore(
+        {source: value for source, (_, value) in inventories.items()},
+        updated_at=max(saved_at for saved_at, _ in inventories.values()),
+    )
+    logger.info("Restored %s inventory of account %s from %s", ", ".join(inventories), account_id, inventory_store.path)
+
+
+async def refresh_inventory(account: Account, source: str, load):
+    """Await an on-demand load of a source.
+
+    The default account's result also replaces that source in the reconciler snapshot, so a forced
+    or stale-while-revalidate refresh is never followed by an older snapshot.
+    """
+    value = await load
+    if account.is_default:
+        await reconciler.update(source, value)
+    return value
+
+
+async def list_schematics_workspaces(
+    account: Account, force_refresh: bool = False, on_page=None
+) -> list[SchematicsWorkspace]:
+    """Schematics workspaces from the inventory snapshot, or the account's result cache.
+
+    on_page is only awaited when this call starts the upstream fetch; it must not raise.
+    """
+    workspaces = None if force_refresh or not account.is_default else reconciler.get("schematics")
+    if workspaces is None:
+        key = ("fetch_schematics_workspaces", await account.account_id())
+        workspaces = await account.results.get_or_fetch(
+            key,
+            lambda: refresh_inventory(account, "schematics", load_schematics_workspaces(account, on_page)),
+            force_refresh,
+        )
+    return workspaces
+
+
+async def list_power_workspaces(
+    account: Account, force_refresh: bool = False
+) -> tuple[list[PowerVSWorkspace], dict[str, str]]:
+    """PowerVS workspaces and per-region errors from the inventory snapshot or the account's result cache"""
+    result = None if force_refresh or not account.is_default else reconciler.get("powervs")
+    if result is None:
+        key = ("fetch_powervs_workspaces", await account.account_id())
+        result = await account.results.get_or_fetch(
+            key, lambda: refresh_inventory(account, "powervs", load_power_workspaces(account)), force_refresh
+        )
+    return result
+
+
+def tool_result(text: str, structured: dict) -> CallToolResult:
+    return CallToolResult(content=[TextContent(type="text", text=text)], structuredContent=structured)
 
 
 # Define services
 @mcp.tool()
-async def fetch_schematics_workspaces() -> str:
-    """Get a list of schematics workspaces in my IBM cloud account."""
-    tokens = await get_api_access_token()
+@instrument_tool
+async def fetch_schematics_workspaces(
+    ctx: Context,
+    force_refresh: bool = False,
+    output_format: OutputFormat = "text",
+    include_text: bool = True,
+) -> Annotated[CallToolResult, SchematicsListing]:
+    """Get a list of schematics workspaces in my IBM cloud account. Set force_refresh to bypass the cache.
+    output_format is one of text, table, json or ndjson. The workspaces are always returned as structured
+    content; set include_text to false to skip the text rendering."""
+    account = resolve_account(ctx)
+    meta = ctx.request_context.meta
+    wants_progress = meta is not None and meta.progressToken is not None
+    streaming = True
+
+    async def on_page(page, fetched, total):
+        # Only called when this request started the upstream fetch (callers joining an in-flight fetch
+        # get no pages). A stale hit returns before its background refresh pages in, so the callback
+        # goes quiet once the request is answered, and progress is best-effort: a client that went
+        # away must not fail the fetch shared with the other callers.
+        if not streaming or not wants_progress:
+            return
+        stream_text = include_text and output_format in STREAMABLE_FORMATS
+        chunk = sch_format_result(page, start=fetched - len(page) + 1, output_format=output_format) if stream_text else None
+        try:
+            await ctx.report_progress(fetched, total, chunk)
+        except Exception:
+            pass
+
+    try:
+        workspaces = await list_schematics_workspaces(account, force_refresh, on_page)
+    finally:
+        streaming = False
+    structured = {
+        "count": len(workspaces),
+        "version": account.versions.record("schematics", workspaces),
+        "workspaces": [workspace.to_dict() for workspace in workspaces],
+    }
+    if not workspaces:
+        return tool_result("Unable to fetch the workspaces", structured)
+    elif not include_text:
+        return tool_result(f"{len(workspaces)} schematics workspaces returned as structured content.", structured)
+    else:
+        # print(workspaces)
+        context_str = sch_format_result(workspaces, output_format=output_format)
+        if output_format in ("text", "table"):
+            context_str += f"\nVersion token: {structured['version']}"
+        logger.debug("%d characters returned", len(context_str))
+        return tool_result(context_str, structured)
+
+
+@mcp.tool()
+@instrument_tool
+async def fetch_powervs_workspaces(
+    ctx: Context,
+    force_refresh: bool = False,
+    output_format: OutputFormat = "text",
+    include_text: bool = True,
+) -> Annotated[CallToolResult, PowerVSListing]:
+    """Get a list of PowerVS or Power Virtual Server workspaces in my IBM cloud account. Set force_refresh to bypass the cache.
+    output_format is one of text, table, json or ndjson. The workspaces are always returned as structured
+    content; set include_text to false to skip the text rendering."""
+    account = resolve_account(ctx)
+    workspaces, errors = await list_power_workspaces(account, force_refresh)
+    structured = {
+        "count": len(workspaces),
+        "version": account.versions.record("powervs", workspaces, errors),
+        "workspaces": [workspace.to_dict() for workspace in workspaces],
+        "unavailable_regions": errors,
+    }
+    if not workspaces:
+        text = "\n".join(["Unable to fetch the workspaces"] + [f"- {dc}: {error}" for dc, error in errors.items()])
+        return tool_result(text, structured)
+    elif not include_text:
+        return tool_result(f"{len(workspaces)} PowerVS workspaces returned as structured content.", structured)
+    else:
+        # print(workspaces)
+        context_str = pvs_format_result(workspaces, errors, output_format)
+        if output_format in ("text", "table"):
+            context_str += f"\nVersion token: {structured['version']}"
+        logger.debug("%d characters returned", len(context_str))
+        return tool_result(context_str, structured)
+
+
+@mcp.tool()
+@instrument_tool
+async def fetch_workspace_changes(
+    ctx: Context,
+    service: Literal["schematics", "powervs"],
+    since: str | None = None,
+    force_refresh: bool = False,
+) -> Annotated[CallToolResult, WorkspaceChanges]:
+    """Get only the schematics or PowerVS workspaces added, changed or removed since a version token.
+
+    Pass the version token returned by a previous listing (or by this tool) as since. Without a known
+    token every workspace is returned as added. The response carries the new version token.
+    Version tokens belong to the session's account. PowerVS workspaces of unavailable regions are
+    not reported as removed; they are listed in unavailable_regions. With several server workers a
+    token is only known to the worker that issued it, unless the persistent cache is enabled (default
+    account only); an unknown token is answered with a full resync.
+    """
+    account = resolve_account(ctx)
+    errors = {}
+    if service == "schematics":
+        workspaces = await list_schematics_workspaces(account, force_refresh)
+    else:
+        workspaces, errors = await list_power_workspaces(account, force_refresh)
 
-    if not tokens:
-        return "Unable to fetch the access token."
+    since_hashes = None
+    if since and account.is_default and account.versions.hashes(service, since) is None:
+        since_hashes = await inventory_store.load_version(await account.account_id(), service, since)
+    delta = account.versions.diff(service, since or "", workspaces, errors, since_hashes)
+    structured = {
+        "service": service,
+        "since": since,
+        "version": delta["version"],
+        "full_resync": delta["full_resync"],
+        "added": [workspace.to_dict() for workspace in delta["added"]],
+        "changed": [workspace.to_dict() for workspace in delta["changed"]],
+        "removed": delta["removed"],
+        "unavailable_regions": errors,
+    }
+    if delta["full_resync"]:
+        summary = f"Unknown or missing version token, returning all {len(workspaces)} workspaces as added."
+    elif not (delta["added"] or delta["changed"] or delta["removed"]):
+        summary = "No changes."
     else:
-        workspaces = get_schematics_workspaces(tokens)
-        if not workspaces:
-            return "Unable to fetch the workspaces"
-        else:
-            # print(workspaces)
-            context_str = sch_format_result(workspaces)
-            print(context_str)
-            return context_str
+        summary = f"{len(delta['added'])} added, {len(delta['changed'])} changed, {len(delta['removed'])} removed."
+    lines = [summary, f"Version token: {delta['version']}"]
+    for kind in ("added", "changed"):
+        lines += [f"{kind}: {json.dumps(record, separators=(',', ':'))}" for record in structured[kind]]
+    lines += [f"removed: {workspace_id}" for workspace_id in delta["removed"]]
+    lines += [f"unavailable region: {dc} - {error}" for dc, error in errors.items()]
+    return tool_result("\n".join(lines), structured)
 
 
 @mcp.tool()
-async def fetch_powervs_workspaces() -> str:
-    """Get a list of PowerVS or Power Virtual Server workspaces in my IBM cloud account."""
-    tokens = await get_api_access_token()
+@instrument_tool
+async def fetch_inventory(
+    ctx: Context,
+    sources: list[Literal["schematics", "powervs"]] | None = None,
+    force_refresh: bool = False,
+    output_format: OutputFormat = "text",
+    include_text: bool = True,
+) -> Annotated[CallToolResult, InventoryListing]:
+    """Get the schematics and PowerVS workspaces (all regions) of my IBM cloud account in one call.
+    Use this instead of calling both listing tools when a question involves both services.
+    The sources are fetched concurrently with one IAM token and merged into one deduplicated list,
+    with the count, timing and error of every source. sources limits the services fetched.
+    output_format, include_text and force_refresh work as in the listing tools."""
+    account = resolve_account(ctx)
+    sources = list(dict.fromkeys(sources or ["schematics", "powervs"]))
+    # One IAM exchange up front; both fetches then reuse the cached token.
+    await account.tokens.get()
+
+    async def fetch(source: str):
+        start = time.perf_counter()
+        try:
+            if source == "schematics":
+                result = await list_schematics_workspaces(account, force_refresh)
+            else:
+                result = await list_power_workspaces(account, force_refresh)
+            return result, None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e) or type(e).__name__, time.perf_counter() - start
+
+    results = await asyncio.gather(*(fetch(source) for source in sources))
 
-    if not tokens:
-        return "Unable to fetch the access token."
+    records = {}
+    statuses = {}
+    region_errors = {}
+    for source, (result, error, elapsed) in zip(sources, results):
+        if source == "powervs" and result is not None:
+            result, region_errors = result
+        status = {"count": 0, "duration_ms": round(elapsed * 1000, 1), "version": None, "error": error}
+        if result is not None:
+            records[source] = unique_records(result)
+            status["count"] = len(records[source])
+            status["version"] = account.versions.record(
+                source, records[source], region_errors if source == "powervs" else ()
+            )
+        statuses[source] = status
+
+    rows = [{"service": source, **record.to_dict()} for source, items in records.items() for record in items]
+    structured = {"count": len(rows), "workspaces": rows, "sources": statuses, "unavailable_regions": region_errors}
+
+    if not include_text:
+        text = f"{len(rows)} workspaces from {', '.join(sources)} returned as structured content."
+    elif output_format == "json":
+        text = json.dumps(rows, separators=(",", ":"))
+    elif output_format == "ndjson":
+        text = "\n".join(json.dumps(row, separators=(",", ":")) for row in rows)
     else:
-        workspaces = get_power_workspaces(tokens)
-        if not workspaces:
-            return "Unable to fetch the workspaces"
-        else:
-            # print(workspaces)
-            context_str = pvs_format_result(workspaces)
-            print(context_str)
-            return context_str
+        sections = []
+        for source in sources:
+            status = statuses[source]
+            title = "Schematics" if source == "schematics" else "PowerVS"
+            if status["error"]:
+                sections.append(f"{title} workspaces: failed after {status['duration_ms']:g} ms - {status['error']}")
+                continue
+            if source == "schematics":
+                body = sch_format_result(records[source], output_format=output_format)
+            else:
+                body = pvs_format_result(records[source], region_errors, output_format)
+            header = f"{title} workspaces ({status['count']}, {status['duration_ms']:g} ms, version {status['version']}):"
+            sections.append(f"{header}\n{body}")
+        text = "\n\n".join(sections)
+    return tool_result(text, structured)
+
+
+@mcp.tool()
+@instrument_tool
+async def query_workspaces(
+    ctx: Context,
+    service: Literal["schematics", "powervs", "all"] = "all",
+    status: str | None = None,
+    location: str | None = None,
+    region: str | None = None,
+    resource_group: str | None = None,
+    created_by: str | None = None,
+    name_prefix: str | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+    fields: list[str] | None = None,
+    sort_by: str | None = None,
+    descending: bool = False,
+    limit: int = 20,
+    force_refresh: bool = False,
+) -> str:
+    """Search schematics and/or PowerVS workspaces and return only the matching rows.
+
+    Filters are case-insensitive exact matches (status, location, region, resource_group, created_by),
+    a name prefix and an inclusive ISO-8601 created_at range (schematics only; a date-only
+    created_before includes that day). fields selects the columns to return (e.g. ["name", "status"]),
+    sort_by orders by any field and limit caps the rows returned.
+    For PowerVS, region is the data center (e.g. us-south) and location the zone (e.g. dal12).
+    """
+    account = resolve_account(ctx)
+    fetches = {}
+    if service in ("schematics", "all"):
+        fetches["schematics"] = list_schematics_workspaces(account, force_refresh)
+    if service in ("powervs", "all"):
+        fetches["powervs"] = list_power_workspaces(account, force_refresh)
+    sources = dict(zip(fetches, await asyncio.gather(*fetches.values())))
+    errors = {}
+    if "powervs" in sources:
+        sources["powervs"], errors = sources["powervs"]
+
+    index = get_workspace_index(sources, account.index_cache)
+    filters = {
+        "status": status,
+        "location": location,
+        "region": region,
+        "resource_group": resource_group,
+        "created_by": created_by,
+    }
+    total, rows = index.query(
+        filters=filters,
+        name_prefix=name_prefix,
+        created_after=created_after,
+        created_before=created_before,
+        fields=fields,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+    )
+    result = {"total_matches": total, "returned": len(rows), "workspaces": rows}
+    if errors:
+        result["unavailable_regions"] = errors
+    return json.dumps(result, separators=(",", ":"))
+
+
+@mcp.tool()
+@instrument_tool
+async def invalidate_workspace_cache(ctx: Context, tool_name: str | None = None) -> str:
+    """Clear cached workspace listings of the session's account, for one tool (e.g. fetch_powervs_workspaces) or all of them."""
+    account = resolve_account(ctx)
+    removed = account.results.invalidate(tool_name)
+    if account.is_default:
+        # The default account is served from the inventory snapshot first.
+        sources = None if tool_name is None else [tool_name.removeprefix("fetch_").removesuffix("_workspaces")]
+        removed += reconciler.invalidate(sources)
+    return f"Removed {removed} cached result(s)."
+
+
+@mcp.tool()
+@instrument_tool
+async def get_cache_stats(ctx: Context) -> str:
+    """Get hit/miss statistics of the workspace result cache and the IAM token cache of the session's account,
+    the inventory snapshot version, any open upstream circuits and process-wide totals."""
+    account = resolve_account(ctx)
+    stats = {"account": account.stats()}
+    if account.is_default:
+        # The reconciler only keeps the default account's inventory.
+        snapshot = reconciler.snapshot
+        stats["inventory"] = {
+            "running": reconciler.running,
+            "version": snapshot.version,
+            "updated_at": snapshot.updated_at,
+            "errors": snapshot.errors,
+        }
+    stats.update(
+        {
+            "upstream_circuits": circuit_states(),
+            "persistent_cache": inventory_store.stats(),
+            "accounts": accounts.stats(),
+            "resource_subscriptions": resource_subscriptions.stats(),
+        }
+    )
+    return json.dumps(stats, indent=2)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+cache_stat_sources.append(
+    lambda: {"result": result_cache.stats(), "token": token_cache.stats(), "persistent": inventory_store.stats()}
+)
+
+
+@mcp.resource(SCHEMATICS_RESOURCE, mime_type="application/json")
+async def schematics_workspaces_resource() -> str:
+    """Schematics workspaces of the default account. Subscribe to be notified when a refresh sees a change."""
+    account = accounts.default
+    workspaces = await list_schematics_workspaces(account)
+    return json.dumps(
+        {
+            "count": len(workspaces),
+            "version": account.versions.record("schematics", workspaces),
+            "workspaces": [workspace.to_dict() for workspace in workspaces],
+        },
+        separators=(",", ":"),
+    )
+
+
+@mcp.resource(POWERVS_RESOURCE, mime_type="application/json")
+async def powervs_region_workspaces_resource(region: str) -> str:
+    """PowerVS workspaces of one region of the default account. Subscribe to be notified when the region changes."""
+    workspaces, errors = await list_power_workspaces(accounts.default)
+    in_region = workspaces_by_region(workspaces).get(region, [])
+    return json.dumps(
+        {
+            "region": region,
+            "count": len(in_region),
+            "workspaces": [workspace.to_dict() for workspace in in_region],
+            "error": errors.get(region),
+        },
+        separators=(",", ":"),
+    )
+
+
+def subscriptions_supported() -> bool:
+    # A stateless streamable-http session ends with its request, so nothing would be left to notify.
+    return not mcp.settings.stateless_http
+
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    if not subscriptions_supported():
+        raise Exception("Resource subscriptions need a stateful transport (sse, stdio or --stateful)")
+    resource_subscriptions.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    resource_subscriptions.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+
+_get_capabilities = mcp._mcp_server.get_capabilities
+
+
+def get_capabilities(*args, **kwargs):
+    # The low-level server always advertises subscribe=False; the handlers above implement it.
+    capabilities = _get_capabilities(*args, **kwargs)
+    if capabilities.resources is not None and subscriptions_supported():
+        capabilities.resources.subscribe = True
+    return capabilities
+
+
+mcp._mcp_server.get_capabilities = get_capabilities
+
+
+async def notify_resource_changes(previous: InventorySnapshot, current: InventorySnapshot) -> None:
+    """Push resources/updated to subscribers of every workspace resource that changed in the snapshot.
+
+    The snapshot moves on reconcile passes and on every on-demand refresh of the default account
+    (refresh_inventory), so subscriptions also fire when the background reconciler is off.
+    """
+    await resource_subscriptions.notify(changed_resource_uris(previous.data, current.data))
+
+
+reconciler.listeners.append(notify_resource_changes)
 
 
 @mcp.resource("echo://{name}")
@@ -71,38 +580,170 @@ def welcome_msg(name: str) -> str:
     return f"Hello {name}, welcome to Mars!"
 
 
-async def call_mcp_tool():
-    url = "http://127.0.0.1:8000/sse"
+async def serve(reconcile_interval: float = RECONCILE_INTERVAL):
+    """Run the stdio server with the shared HTTP client (and optional reconciler) open for its whole lifetime"""
+    reconciler.interval = reconcile_interval
+    async with http_client_lifespan():
+        await restore_inventory()
+        async with reconciler.lifespan():
+            await mcp.run_stdio_async()
+
+
+def create_app():
+    """Build the ASGI app for the HTTP transports; used as a uvicorn factory by every worker.
+
+    Workers import this module fresh, so the transport and its options come from the environment
+    (set by __main__): MCP_TRANSPORT (sse or streamable-http), MCP_HOST, MCP_PORT, MCP_ALLOWED_HOSTS,
+    MCP_STATELESS_HTTP, MCP_JSON_RESPONSE, RECONCILE_INTERVAL and PERSISTENT_CACHE_PATH.
+
+    With several workers, stateless sessions let any worker answer any request, but the in-memory
+    state is per worker: result and token caches are kept once per worker, and version tokens are
+    only known to the worker that issued them (fetch_workspace_changes on another worker answers
+    with a full resync) unless PERSISTENT_CACHE_PATH shares the default account's tokens. Only the worker holding the reconcile lock runs the reconciler, so IBM Cloud
+    is polled once per interval rather than once per worker; the other workers fetch on demand.
+    """
+    transport = os.getenv("MCP_TRANSPORT", "sse")
+    reconciler.interval = float(os.getenv("RECONCILE_INTERVAL", "0"))
+    inventory_store.path = os.getenv("PERSISTENT_CACHE_PATH", "")
+    mcp.settings.host = os.getenv("MCP_HOST", "127.0.0.1")
+    mcp.settings.port = int(os.getenv("MCP_PORT", "8000"))
+    if mcp.settings.host not in LOOPBACK_HOSTS:
+        # FastMCP only protects against DNS rebinding for the loopback host it was built with; on any
+        # other interface accept the Host headers in MCP_ALLOWED_HOSTS, or any when it is unset.
+        allowed_hosts = [host.strip() for host in os.getenv("MCP_ALLOWED_HOSTS", "").split(",") if host.strip()]
+        mcp.settings.transport_security = (
+            TransportSecuritySettings(enable_dns_rebinding_protection=True, allowed_hosts=allowed_hosts)
+            if allowed_hosts
+            else None
+        )
+    if transport == "streamable-http":
+        mcp.settings.stateless_http = os.getenv("MCP_STATELESS_HTTP", "true").lower() in ("1", "true", "yes")
+        mcp.settings.json_response = os.getenv("MCP_JSON_RESPONSE", "false").lower() in ("1", "true", "yes")
+        app = mcp.streamable_http_app()
+    else:
+        app = mcp.sse_app()
+
+    transport_lifespan = app.router.lifespan_context
+    lock_path = os.getenv("RECONCILE_LOCK_PATH") or os.path.join(
+        tempfile.gettempdir(), f"ibmcloud-mcp-reconciler-{mcp.settings.port}.lock"
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        with leader_lock(lock_path) if reconciler.interval > 0 else nullcontext(False) as leader:
+            if not leader:
+                reconciler.interval = 0
+            async with http_client_lifespan():
+                await restore_inventory()
+                async with reconciler.lifespan(), transport_lifespan(app):
+                    yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+async def call_mcp_tool(
+    tool_name: str = "fetch_schematics_workspaces",
+    arguments: dict | None = None,
+    url: str = "http://127.0.0.1:8000/sse",
+):
+    # Single-call smoke test; benchmarks/bench_load.py drives many of these sessions concurrently.
+    # The client stack is imported here so serving never loads it.
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
     async with sse_client(url) as streams:
         async with ClientSession(streams[0], streams[1]) as session:
             await session.initialize()
-            response = await session.call_tool(name="fetch_schematics_workspaces")
+            response = await session.call_tool(name=tool_name, arguments=arguments)
             print("Tool response:", response.content)
 
 
 if __name__ == "__main__":
-    print("🚀 Starting server... ")
-
-    app = mcp.sse_app()
-    print("Registered routes:")
-    for route in app.routes:
-        print(f"  {route.path}")
-
-    # mcp.run("sse")
-
     # Debug Mode
     # uv run mcp dev server.py
 
     # Production Mode
     # uv run server.py --server_type=sse
+    # uv run server.py --server_type=streamable-http --workers=4
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--server_type", type=str, default="sse", choices=["sse", "stdio"])
+    parser.add_argument("--server_type", type=str, default="sse", choices=["sse", "streamable-http", "stdio"])
+    parser.add_argument(
+        "--reconcile_interval",
+        type=float,
+        default=RECONCILE_INTERVAL,
+        help="Refresh the inventory snapshot every N seconds in the background (0 disables)",
+    )
+    parser.add_argument("--host", type=str, default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("MCP_WORKERS", "1")),
+        help="uvicorn worker processes; caches (and version tokens, without --persistent_cache) are per worker, one worker reconciles",
+    )
+    parser.add_argument(
+        "--limit_concurrency",
+        type=int,
+        default=int(os.getenv("MCP_LIMIT_CONCURRENCY", "0")) or None,
+        help="Maximum concurrent connections per worker before answering 503",
+    )
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("MCP_BACKLOG", "2048")))
+    parser.add_argument(
+        "--graceful_timeout",
+        type=float,
+        default=float(os.getenv("MCP_GRACEFUL_TIMEOUT", "30")),
+        help="Seconds to let in-flight requests finish on shutdown",
+    )
+    parser.add_argument(
+        "--stateful",
+        action="store_true",
+        help="Keep streamable-http sessions in worker memory (only valid with a single worker)",
+    )
+    parser.add_argument("--json_response", action="store_true", help="Answer streamable-http requests with plain JSON")
+    parser.add_argument(
+        "--persistent_cache",
+        type=str,
+        default=os.getenv("PERSISTENT_CACHE_PATH", ""),
+        help="SQLite file used to serve the last inventory immediately after a restart",
+    )
 
     args = parser.parse_args()
 
-    app = mcp.sse_app()
+    # stderr: in stdio mode stdout carries the MCP protocol.
+    print(f"🚀 Starting server ({args.server_type})... ", file=sys.stderr)
+
+    if args.server_type == "stdio":
+        inventory_store.path = args.persistent_cache
+        asyncio.run(serve(args.reconcile_interval))
+    else:
+        if args.workers > 1 and (args.server_type == "sse" or args.stateful):
+            # SSE and stateful sessions live in one process; their follow-up requests may land on another worker.
+            parser.error("--workers > 1 requires --server_type=streamable-http without --stateful")
+
+        os.environ["MCP_TRANSPORT"] = args.server_type
+        os.environ["MCP_HOST"] = args.host
+        os.environ["MCP_PORT"] = str(args.port)
+        os.environ["MCP_STATELESS_HTTP"] = str(not args.stateful)
+        os.environ["MCP_JSON_RESPONSE"] = str(args.json_response)
+        os.environ["RECONCILE_INTERVAL"] = str(args.reconcile_interval)
+        os.environ["PERSISTENT_CACHE_PATH"] = args.persistent_cache
 
-    print(app.routes)
+        import uvicorn
 
-    mcp.run(args.server_type)
+        # A single worker serves the app built here; importing "server:create_app" would run this
+        # module a second time. Worker processes need the import string.
+        app = create_app() if args.workers == 1 else "server:create_app"
+        uvicorn.run(
+            app,
+            factory=args.workers > 1,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            limit_concurrency=args.limit_concurrency,
+            backlog=args.backlog,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            # Neither MCP transport uses websockets; skip importing a websocket implementation at boot.
+            ws="none",
+        )
@@ -2,13 +2,14 @@ from ibm_watsonx_ai import APIClient
 from ibm_watsonx_ai import Credentials
 from ibm_watsonx_ai.foundation_models import ModelInference
 from dotenv import load_dotenv
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
-from typing_extensions import TypedDict
-from typing import Annotated, Literal
-from mcp.client.session import ClientSession
-from mcp.client.sse import sse_client
+from typing import Literal
+from client_common.graph import AGENT_TITLES, AGENT_TOOLS, State, merge_answers_node, next_agents, router
+from client_common.intent import intent_classifier, labels_in_text
+from client_common.mcp_pool import ToolPrefetch, mcp_pool
+from client_common.streaming import STREAM_REPLIES, ReplyPrinter, stream_graph, timing_summary
 import asyncio, os, warnings
 
 # Load environment variables
@@ -44,40 +45,39 @@ class MessageClassifier(BaseModel):
     )
 
 
-# Define state
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
-    message_type: str | None
-    powervs_context: str | None
-
-
 async def classify_message(state: dict):
     last_message = state["messages"][-1]
+    intents = intent_classifier.classify(last_message.content)
+    labels = [intent.label for intent in intents]
+    if intent_classifier.is_confident(intents):
+        # Decided locally, no model call; only the chosen agents' tools are fetched.
+        prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels, mode="likely")
+        return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
 
     prompt = (
-        "You are a classifier. Classify the following sentence as 'powervs' or 'schematics' for agent selection.\n"
-        "Respond with exactly one word: either 'powervs' or 'schematics'. No punctuation, no line breaks, no explanations.\n"
+        "You are a classifier. Classify the following sentence as 'powervs', 'schematics' or 'both' for agent selection.\n"
+        "Respond with exactly one word: 'powervs', 'schematics' or 'both'. No punctuation, no line breaks, no explanations.\n"
         "Classify as 'powervs' if it mentions: power, power virtual server, powervs, POWER, or pvs.\n"
         "Classify as 'schematics' if it mentions: deployment, schematics, sch, DA, DAs, das, or da.\n"
         f"Sentence: {last_message}\n"
         "Response:"
     )
 
-    # Call the model (ensure it's awaited if model is async)
-    response = (
-        await model.generate_text(prompt=prompt)
-        if callable(getattr(model, "generate_text", None))
-        and hasattr(model.generate_text, "__call__")
-        and hasattr(model.generate_text, "__await__")
-        else model.generate_text(prompt=prompt)
-    )
+    # Start the agents' tool calls now so they overlap the classifier model call, which runs
+    # on a worker thread (generate_text is blocking).
+    prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels)
 
-    # Normalize and clean response
-    classification = response.strip().lower()
-    if response.__contains__("powervs"):
-        return {"message_type": "powervs"}
-    else:
-        return {"message_type": "schematics"}
+    async def ask_model() -> list[str]:
+        return labels_in_text(await asyncio.to_thread(model.generate_text, prompt=prompt))
+
+    # A failed or unusable model answer keeps the local guess.
+    try:
+        intents = await intent_classifier.fallback(intents, ask_model)
+    except BaseException:
+        prefetch.keep([])
+        raise
+    labels = [intent.label for intent in intents]
+    return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
 
     # if classification == "powervs":
     #     return {"message_type": "powervs"}
@@ -101,9 +101,18 @@ async def classify_message(state: dict):
     #     return {"message_type": "schematics"}
 
 
-# Router node
-def router(state: State):
-    return {"next": state.get("message_type", "powervs")}
+# Stream an agent's chat reply; the tokens reach the chat loop through the graph's custom stream
+async def generate_answer(agent: str, messages: list) -> str:
+    write = get_stream_writer()
+    content = ""
+    async for chunk in await model.achat_stream(messages=messages):
+        if not chunk.get("choices"):
+            continue
+        token = chunk["choices"][0]["delta"].get("content") or ""
+        content += token
+        write({"agent": agent, "token": token})
+    write({"agent": agent, "done": True})
+    return content
 
 
 # PowerVS agent node
@@ -112,7 +121,7 @@ async def powervs_agent(state: State):
     print("PowerVS Agent called.")
 
     try:
-        context = await call_mcp_tool(tool_name="fetch_powervs_workspaces")
+        context = await call_mcp_tool(tool_name="fetch_powervs_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching powervs workspaces: {str(e)}"
 
@@ -130,9 +139,7 @@ async def powervs_agent(state: State):
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await model.achat(messages)
-    # print(reply["choices"][0]["message"]["content"])
-    return {"messages": [{"role": "assistant", "content": reply["choices"][0]["message"]["content"]}]}
+    return {"answers": {"powervs": await generate_answer("powervs", messages)}}
 
 
 # Schematics agent node
@@ -141,7 +148,7 @@ async def schematics_agent(state: State):
     print("Schematics Agent called.")
 
     try:
-        context = await call_mcp_tool(tool_name="fetch_schematics_workspaces")
+        context = await call_mcp_tool(tool_name="fetch_schematics_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching schematics workspaces: {str(e)}"
 
@@ -159,19 +166,12 @@ async def schematics_agent(state: State):
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await model.achat(messages)
-    # print(reply["choices"][0]["message"]["content"])
-    return {"messages": [{"role": "assistant", "content": reply["choices"][0]["message"]["content"]}]}
+    return {"answers": {"schematics": await generate_answer("schematics", messages)}}
 
 
-async def call_mcp_tool(tool_name: str):
-    url = "http://127.0.0.1:8000/sse"
-    async with sse_client(url) as streams:
-        async with ClientSession(streams[0], streams[1]) as session:
-            await session.initialize()
-            response = await session.call_tool(name=tool_name)
-            # print("Tool response:", response.content)
-            return response.content
+async def call_mcp_tool(tool_name: str, prefetch: ToolPrefetch | None = None):
+    response = await (prefetch.result(tool_name) if prefetch else mcp_pool.call_tool(tool_name))
+    return response.content
 
 
 # Build the graph
@@ -180,12 +180,14 @@ graph_builder.add_node("classifier", classify_message)
 graph_builder.add_node("router", router)
 graph_builder.add_node("powervs", powervs_agent)
 graph_builder.add_node("schematics", schematics_agent)
+graph_builder.add_node("merge", merge_answers_node)
 
 graph_builder.add_edge(START, "classifier")
 graph_builder.add_edge("classifier", "router")
-graph_builder.add_conditional_edges("router", lambda state: state.get("next"), {"powervs": "powervs", "schematics": "schematics"})
-graph_builder.add_edge("powervs", END)
-graph_builder.add_edge("schematics", END)
+graph_builder.add_conditional_edges("router", next_agents, {"powervs": "powervs", "schematics": "schematics"})
+graph_builder.add_edge("powervs", "merge")
+graph_builder.add_edge("schematics", "merge")
+graph_builder.add_edge("merge", END)
 
 graph = graph_builder.compile()
 
@@ -194,19 +196,29 @@ graph = graph_builder.compile()
 async def run_chatbot():
     state = {"messages": [], "message_type": None}
 
-    while True:
-        user_input = input("^_^ You      : ")
-        if user_input == "exit":
-            print("Bye!")
-            break
-
-        state["messages"] = state.get("messages", []) + [{"role": "user", "content": user_input}]
-
-        state = await graph.ainvoke(state)
-
-        if state.get("messages") and len(state["messages"]) > 0:
-            last_message = state["messages"][-1]
-            print(f"o_o Assistant: {last_message.content}")
+    try:
+        while True:
+            user_input = await asyncio.to_thread(input, "^_^ You      : ")
+            if user_input == "exit":
+                print("Bye!")
+                summary = timing_summary()
+                if summary:
+                    print(summary)
+                break
+
+            state["messages"] = state.get("messages", []) + [{"role": "user", "content": user_input}]
+
+            if STREAM_REPLIES:
+                state = await stream_graph(graph, state, ReplyPrinter(AGENT_TITLES))
+                continue
+
+            state = await graph.ainvoke(state)
+
+            if state.get("messages") and len(state["messages"]) > 0:
+                last_message = state["messages"][-1]
+                print(f"o_o Assistant: {last_message.content}")
+    finally:
+        await mcp_pool.aclose()
 
 
 if __name__ == "__main__":
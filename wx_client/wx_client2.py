@@ -2,17 +2,18 @@ import os
 import asyncio
 import warnings
 from dotenv import load_dotenv
-from typing import Annotated, Literal
-from typing_extensions import TypedDict
+from typing import Literal
 from pydantic import BaseModel, Field
 
 from ibm_watsonx_ai import APIClient, Credentials
 from ibm_watsonx_ai.foundation_models import ModelInference
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
 
-from mcp.client.session import ClientSession
-from mcp.client.sse import sse_client
+from client_common.graph import AGENT_TITLES, AGENT_TOOLS, State, merge_answers_node, next_agents, router
+from client_common.intent import intent_classifier, labels_in_text
+from client_common.mcp_pool import ToolPrefetch, mcp_pool
+from client_common.streaming import STREAM_REPLIES, ReplyPrinter, stream_graph, timing_summary
 
 # Load environment variables
 load_dotenv()
@@ -55,65 +56,60 @@ class MessageClassifier(BaseModel):
     )
 
 
-# State definition
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
-    message_type: str | None
-    powervs_context: str | None
-
-
-# Message classification
-# async def classify_message(state: dict) -> dict:
-#     last_message = state["messages"][-1].content  # Fixed: use attribute access
-#     # print(last_message)
-
-#     prompt = f"""
-#         Classify user message as powervs or schematics.
-#         Do not return anything else. Do not give examples, sentences, punctuation, line breaks or explanations.
-#         Classify as 'powervs' if it mentions: power, power virtual server, powervs, POWER, or pvs.
-#         Classify as 'schematics' if it mentions: deployment, schematics, sch, DA, DAs, das, or da.
-#         User message: {last_message}
-#         "Response:"
-#         """
-
-#     response = classifier_model.generate_text(prompt=prompt)
-#     classification = response.strip().lower()
-#     print(f"classification: {classification}")
-
-#     sch_list = ["schematics", "sch", "DA", "da", "deployments"]
-
-#     if classification == "powervs" or classification == "schematics":
-#         return {"message_type": classification}
-#     else:
-#         print("Inside Fallback")
-#         return {"message_type": "powervs"}  # Fallback
-
-
-# Message classification - workaround. Above function not working.
-def classify_message(state: dict) -> str:
+# Message classification: local intent classifier, with the classifier model for uncertain messages
+async def classify_message(state: dict) -> dict:
     """
-    Classify a user message as 'powervs' or 'schematics'.
+    Classify a user message as 'powervs', 'schematics' or both.
 
-    - Classify as 'powervs' if it mentions: power, power virtual server, powervs, POWER, or pvs.
-    - Classify as 'schematics' if it mentions: deployment, schematics, sch, DA, DAs, das, or da.
+    Keyword and n-gram matching (client_common.intent) decide most messages in microseconds; only messages
+    below the confidence threshold are sent to classifier_model. The agents' tool calls are
+    started before that model call so they are already under way when the router picks.
 
     Returns:
-        str: 'powervs' or 'schematics'
+        dict: message_types (one or both of 'powervs' and 'schematics'), and the speculative tool calls
     """
     last_message = state["messages"][-1].content
-    message_lower = last_message.lower()
-
-    schematics_keywords = {"deployment", "schematics", "sch", "da", "das"}
-
-    if any(keyword in message_lower for keyword in schematics_keywords):
-        return {"message_type": "schematics"}
-    else:
-        return {"message_type": "powervs"}
-
-
-# Router node
-def router(state: State) -> dict:
-    return {"next": state.get("message_type", "powervs")}
+    intents = intent_classifier.classify(last_message)
+    labels = [intent.label for intent in intents]
+    if intent_classifier.is_confident(intents):
+        prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels, mode="likely")
+        return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
+
+    prefetch = ToolPrefetch(AGENT_TOOLS).start(likely=labels)
+    prompt = f"""
+        Classify user message as powervs, schematics or both.
+        Do not return anything else. Do not give examples, sentences, punctuation, line breaks or explanations.
+        Classify as 'powervs' if it mentions: power, power virtual server, powervs, POWER, or pvs.
+        Classify as 'schematics' if it mentions: deployment, schematics, sch, DA, DAs, das, or da.
+        User message: {last_message}
+        "Response:"
+        """
+
+    async def ask_model() -> list[str]:
+        return labels_in_text(await asyncio.to_thread(classifier_model.generate_text, prompt=prompt))
+
+    # The small model does not always answer with a bare label; a failed or unusable answer keeps the local guess.
+    try:
+        intents = await intent_classifier.fallback(intents, ask_model)
+    except BaseException:
+        prefetch.keep([])
+        raise
+    labels = [intent.label for intent in intents]
+    return {"message_type": labels[0], "message_types": labels, "answers": None, "prefetch": prefetch}
+
+
+# Stream an agent's chat reply; the tokens reach the chat loop through the graph's custom stream
+async def generate_answer(agent: str, messages: list) -> str:
+    write = get_stream_writer()
+    content = ""
+    async for chunk in await model.achat_stream(messages=messages):
+        if not chunk.get("choices"):
+            continue
+        token = chunk["choices"][0]["delta"].get("content") or ""
+        content += token
+        write({"agent": agent, "token": token})
+    write({"agent": agent, "done": True})
+    return content
 
 
 # PowerVS agent
@@ -122,7 +118,7 @@ async def powervs_agent(state: State) -> dict:
     print("PowerVS Agent called.")
 
     try:
-        context = await call_mcp_tool("fetch_powervs_workspaces")
+        context = await call_mcp_tool("fetch_powervs_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching powervs workspaces: {str(e)}"
 
@@ -138,8 +134,7 @@ async def powervs_agent(state: State) -> dict:
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await model.achat(messages)
-    return {"messages": [{"role": "assistant", "content": reply["choices"][0]["message"]["content"]}]}
+    return {"answers": {"powervs": await generate_answer("powervs", messages)}}
 
 
 # Schematics agent
@@ -148,7 +143,7 @@ async def schematics_agent(state: State) -> dict:
     print("Schematics Agent called.")
 
     try:
-        context = await call_mcp_tool("fetch_schematics_workspaces")
+        context = await call_mcp_tool("fetch_schematics_workspaces", prefetch=state.get("prefetch"))
     except Exception as e:
         context = f"Error fetching schematics workspaces: {str(e)}"
 
@@ -164,18 +159,13 @@ async def schematics_agent(state: State) -> dict:
         {"role": "user", "content": last_message.content},
     ]
 
-    reply = await model.achat(messages)
-    return {"messages": [{"role": "assistant", "content": reply["choices"][0]["message"]["content"]}]}
+    return {"answers": {"schematics": await generate_answer("schematics", messages)}}
 
 
 # Tool invocation
-async def call_mcp_tool(tool_name: str) -> str:
-    url = "http://127.0.0.1:8000/sse"
-    async with sse_client(url) as streams:
-        async with ClientSession(streams[0], streams[1]) as session:
-            await session.initialize()
-            response = await session.call_tool(name=tool_name)
-            return response.content
+async def call_mcp_tool(tool_name: str, prefetch: ToolPrefetch | None = None) -> str:
+    response = await (prefetch.result(tool_name) if prefetch else mcp_pool.call_tool(tool_name))
+    return response.content
 
 
 # Build the graph
@@ -184,12 +174,14 @@ graph_builder.add_node("classifier", classify_message)
 graph_builder.add_node("router", router)
 graph_builder.add_node("powervs", powervs_agent)
 graph_builder.add_node("schematics", schematics_agent)
+graph_builder.add_node("merge", merge_answers_node)
 
 graph_builder.add_edge(START, "classifier")
 graph_builder.add_edge("classifier", "router")
-graph_builder.add_conditional_edges("router", lambda state: state.get("next"), {"powervs": "powervs", "schematics": "schematics"})
-graph_builder.add_edge("powervs", END)
-graph_builder.add_edge("schematics", END)
+graph_builder.add_conditional_edges("router", next_agents, {"powervs": "powervs", "schematics": "schematics"})
+graph_builder.add_edge("powervs", "merge")
+graph_builder.add_edge("schematics", "merge")
+graph_builder.add_edge("merge", END)
 
 graph = graph_builder.compile()
 
@@ -198,18 +190,28 @@ graph = graph_builder.compile()
 async def run_chatbot():
     state = {"messages": [], "message_type": None}
 
-    while True:
-        user_input = input("^_^ You      : ")
-        if user_input.lower() == "exit":
-            print("Bye!")
-            break
-
-        state["messages"].append({"role": "user", "content": user_input})
-        state = await graph.ainvoke(state)
-
-        if state.get("messages"):
-            last_message = state["messages"][-1]
-            print(f"o_o Assistant: {last_message.content}")
+    try:
+        while True:
+            user_input = await asyncio.to_thread(input, "^_^ You      : ")
+            if user_input.lower() == "exit":
+                print("Bye!")
+                summary = timing_summary()
+                if summary:
+                    print(summary)
+                break
+
+            state["messages"].append({"role": "user", "content": user_input})
+            if STREAM_REPLIES:
+                state = await stream_graph(graph, state, ReplyPrinter(AGENT_TITLES))
+                continue
+
+            state = await graph.ainvoke(state)
+
+            if state.get("messages"):
+                last_message = state["messages"][-1]
+                print(f"o_o Assistant: {last_message.content}")
+    finally:
+        await mcp_pool.aclose()
 
 
 if __name__ == "__main__":